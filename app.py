@@ -2,6 +2,7 @@ from flask import Flask
 from config import config
 from database import init_db
 from routes import register_blueprints
+from commands import register_commands
 from telegram_bot import setup_bot, set_flask_app
 import os
 import threading
@@ -23,6 +24,9 @@ init_db(app)
 # Blueprintlarni ro'yxatdan o'tkazish
 register_blueprints(app)
 
+# CLI buyruqlari
+register_commands(app)
+
 # Telegram botni sozlash (ixtiyoriy - agar token bo'lmasa, bot ishlamaydi)
 telegram_app = None
 try:
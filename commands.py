@@ -0,0 +1,159 @@
+import click
+from database import db
+from models import User, Profile, UserTariff, ListingCounter, UserPair, Favorite
+from models.profile import top_until_expression
+
+
+def register_commands(app):
+    """CLI buyruqlarini ro'yxatdan o'tkazish (flask <buyruq>)"""
+
+    @app.cli.command('rebuild-feed-rank')
+    def rebuild_feed_rank():
+        """Profillardagi TOP muddatini (top_until) tariflardan qayta hisoblash"""
+        top_until_by_user = dict(
+            db.session.query(UserTariff.user_id, db.func.max(top_until_expression())).filter(
+                UserTariff.is_active == True,
+                UserTariff.is_top == True
+            ).group_by(UserTariff.user_id).all()
+        )
+
+        updated = 0
+        for profile in Profile.query.all():
+            top_until = top_until_by_user.get(profile.user_id)
+            if profile.top_until != top_until:
+                profile.top_until = top_until
+                updated += 1
+
+        db.session.commit()
+        print(f"✅ {updated} ta profil yangilandi")
+
+    @app.cli.command('rebuild-active-tariffs')
+    def rebuild_active_tariffs():
+        """Foydalanuvchilardagi aktiv tarif ko'rsatkichini (active_tariff_id/active_until) qayta hisoblash"""
+        updated = 0
+        for user in User.query.all():
+            active = (user.active_tariff_id, user.active_until)
+            user.sync_active_tariff()
+            if (user.active_tariff_id, user.active_until) != active:
+                updated += 1
+
+        db.session.commit()
+        print(f"✅ {updated} ta foydalanuvchi yangilandi")
+
+    @app.cli.command('rebuild-profile-completion')
+    def rebuild_profile_completion():
+        """Profillardagi is_complete va completion_pct ustunlarini qayta hisoblash"""
+        updated = 0
+        for profile in Profile.query.all():
+            is_complete, completion_pct = profile.is_complete, profile.completion_pct
+            profile.refresh_completion()
+            if (profile.is_complete, profile.completion_pct) != (is_complete, completion_pct):
+                updated += 1
+
+        db.session.commit()
+        print(f"✅ {updated} ta profil yangilandi")
+
+    @app.cli.command('rebuild-listing-counters')
+    def rebuild_listing_counters():
+        """Jins bo'yicha faol e'lonlar hisoblagichlarini qayta hisoblash"""
+        counts = ListingCounter.rebuild()
+        print(f"✅ Hisoblagichlar yangilandi: {counts}")
+
+    @app.cli.command('rebuild-user-pairs')
+    def rebuild_user_pairs():
+        """user_pairs jadvalini match_requests dan qayta qurish (har juftlik uchun oxirgi so'rov)"""
+        print(f"✅ {UserPair.rebuild()} ta juftlik yaratildi")
+
+    @app.cli.command('rebuild-favorite-counts')
+    def rebuild_favorite_counts():
+        """Takroriy sevimlilarni o'chirish, unique indeksni yaratish va favorited_count ni qayta hisoblash"""
+        keep_ids = db.select(db.func.min(Favorite.id)).group_by(Favorite.user_id, Favorite.favorite_user_id)
+        duplicates = db.session.query(Favorite.id).filter(
+            Favorite.id.not_in([favorite_id for (favorite_id,) in db.session.execute(keep_ids)])
+        ).all()
+        if duplicates:
+            Favorite.query.filter(Favorite.id.in_([favorite_id for (favorite_id,) in duplicates])).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+
+        index = next(index for index in Favorite.__table__.indexes if index.name == 'uq_favorites_user')
+        index.create(db.engine, checkfirst=True)
+
+        counts = dict(
+            db.session.query(Favorite.favorite_user_id, db.func.count(Favorite.id))
+            .group_by(Favorite.favorite_user_id).all()
+        )
+        profiles_table = Profile.__table__
+        rows = [
+            {'counted_user_id': user_id, 'counted': counts.get(user_id, 0)}
+            for user_id, in db.session.query(Profile.user_id)
+        ]
+        if rows:
+            db.session.execute(
+                profiles_table.update().where(profiles_table.c.user_id == db.bindparam('counted_user_id'))
+                .values(favorited_count=db.bindparam('counted'), updated_at=profiles_table.c.updated_at),
+                rows
+            )
+        db.session.commit()
+        print(f"✅ {len(duplicates)} ta takroriy sevimli o'chirildi, {len(rows)} ta profil hisoblagichi yangilandi")
+
+    @app.cli.command('encode-lookup-columns')
+    @click.option('--null-unknown', is_flag=True, help="Lug'atda yo'q qiymatlarni NULL qilish (default: to'xtash)")
+    def encode_lookup_columns(null_unknown):
+        """Matnli lookup ustunlarini (viloyat, holatlar, tarif nomi ...) SMALLINT kodlarga o'tkazish"""
+        from models.lookup import encode_text_columns
+        migrated, unknown = encode_text_columns(null_unknown=null_unknown)
+        for (table_name, column_name), values in unknown.items():
+            print(f"⚠️ {table_name}.{column_name}: lug'atda yo'q qiymatlar {values}")
+        if unknown and not null_unknown:
+            print("❌ Migratsiya to'xtatildi: qiymatlarni LOOKUPS ga qo'shing yoki --null-unknown bilan ishga tushiring")
+            return
+        print(f"✅ {len(migrated)} ta ustun kodlandi: {', '.join(migrated) or '-'}")
+
+    @app.cli.command('compute-daily-suggestions')
+    @click.option('--workers', type=int, default=None, help='Jarayonlar soni (default: DAILY_SUGGESTIONS_WORKERS)')
+    def compute_daily_suggestions_command(workers):
+        """Kunlik tavsiyalarni hisoblash (har kecha cron orqali)"""
+        from services.suggestions import compute_daily_suggestions
+        stats = compute_daily_suggestions(workers=workers)
+        print(f"✅ Tavsiyalar hisoblandi: {stats}")
+
+    @app.cli.command('bench-profile-dict')
+    @click.option('--profiles', type=int, default=200, help='Profillar soni (feed sahifalari hajmida)')
+    @click.option('--rounds', type=int, default=50)
+    def bench_profile_dict(profiles, rounds):
+        """Profile.to_dict() mikrobenchmarki: keshsiz va (id, version) keshi bilan"""
+        import time
+        from models.profile import serialized_profiles
+
+        sample = Profile.query.limit(profiles).all()
+        if not sample:
+            print("⚠️ Profillar yo'q")
+            return
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for profile in sample:
+                profile._serialize()
+        uncached = time.perf_counter() - started
+
+        for profile in sample:
+            profile.to_dict()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for profile in sample:
+                profile.to_dict()
+        cached = time.perf_counter() - started
+
+        calls = rounds * len(sample)
+        print(f"keshsiz: {uncached / calls * 1e6:.1f} µs/profil")
+        print(f"kesh bilan: {cached / calls * 1e6:.1f} µs/profil ({uncached / cached:.1f}x)")
+        print(f"keshdagi profillar: {len(serialized_profiles)}")
+
+    @app.cli.command('send-daily-suggestions')
+    def send_daily_suggestions_command():
+        """Bugungi tavsiyalarni bot orqali digest sifatida yuborish"""
+        from services.suggestions import send_daily_digests
+        sent, failed = send_daily_digests()
+        print(f"✅ {sent} ta digest yuborildi, {failed} ta xato")
@@ -40,6 +40,32 @@ class Config:
     VIP_TARIFF_TOP_DAYS = 15  # 15 kun TOP
     VIP_TARIFF_PRICE = 250000  # 250,000 so'm
 
+    # Feed settings
+    FEED_CACHE_TTL = 30  # Feed sahifalari keshi (soniya)
+    FEED_BATCH_MAX_IDS = 10  # /feed/api/listings/batch da bir martada e'lonlar soni
+    FEED_EXCLUSIONS_TTL = 300  # Feed'dan chiqarib tashlanadiganlar massivi (soniya)
+    TOP_LISTINGS_TTL = 60  # Jins bo'yicha TOP e'lonlar ro'yxatini qayta qurish oralig'i (soniya)
+    SIMILAR_PROFILES_TTL = 300  # O'xshash profillar natijalari keshi (soniya)
+    SIMILAR_PROFILES_LIMIT = 6  # Profil sahifasidagi o'xshash profillar soni
+    PROFILE_DICT_CACHE_SIZE = 20000  # Profile.to_dict() natijalari keshi (profillar soni)
+    PROFILE_DICT_CACHE_TTL = 3600  # (soniya)
+
+    # Kunlik tavsiyalar (flask compute-daily-suggestions / send-daily-suggestions)
+    DAILY_SUGGESTIONS_TOP_K = 10  # Har bir foydalanuvchi uchun saqlanadigan tavsiyalar soni
+    DAILY_SUGGESTIONS_MIN_SCORE = 6  # Minimal ikki tomonlama moslik bali (8 dan)
+    DAILY_SUGGESTIONS_WORKERS = int(os.getenv('DAILY_SUGGESTIONS_WORKERS', 0))  # 0 - CPU soni
+    DAILY_SUGGESTIONS_PER_MESSAGE = 5  # Digest xabaridagi tavsiyalar soni
+
+    # Profil rasmlari
+    MEDIA_DIR = os.getenv('MEDIA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'media'))
+    PHOTO_MAX_BYTES = 10 * 1024 * 1024  # Yuklanadigan rasmning eng katta hajmi
+    PHOTO_WORKERS = int(os.getenv('PHOTO_WORKERS', 2))  # O'lchamlarni yaratuvchi jarayonlar soni
+
+    # Profil ko'rishlari (worker xotirasida yig'ilib guruhlab yoziladi)
+    VIEW_COUNTER_FLUSH_INTERVAL = 30  # Bazaga yozish oralig'i (soniya)
+    VIEW_COUNTER_MAX_PENDING = 1000  # Shuncha profil to'plansa oraliqni kutmasdan yoziladi
+    UNIQUE_VIEWERS_DAYS = 7  # Profile.unique_viewers davri (kun)
+
     # Chat settings
     CHAT_DURATION_DAYS = 7  # 7 kunlik chat
 
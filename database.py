@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -9,3 +11,67 @@ def init_db(app):
     db.init_app(app)
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+
+        # Jins bo'yicha faol e'lonlar hisoblagichlari (mavjud bazada birinchi ishga tushishda)
+        from models import ListingCounter
+        ListingCounter.seed()
+
+        # So'rov yuborilgan juftliklar (mavjud bazada match_requests dan)
+        from models import UserPair
+        UserPair.seed()
+
+        # Aktiv tarif ko'rsatkichi (users.active_until) - mavjud bazada aktiv tariflardan
+        from models import User
+        User.seed_active_tariffs()
+
+        # TOP muddati (profiles.top_until) - mavjud bazada aktiv TOP tariflardan
+        from models import Profile
+        Profile.seed_top_until()
+
+        # Profil to'liqligi (is_complete/completion_pct) - mavjud bazada bo'sh ustunlar
+        Profile.seed_completion()
+
+        # Lookup kodlarining matnli qiymatlari (SQL hisobotlar uchun)
+        from models import LookupValue
+        LookupValue.sync()
+
+        # bio/profession bo'yicha qidiruv indeksi (FTS5 / FULLTEXT)
+        from services.search import profile_search
+        profile_search.setup(db.engine)
+
+
+def upgrade_schema():
+    """Mavjud jadvallarga yangi ustun va indekslarni qo'shish
+
+    db.create_all() faqat yo'q jadvallarni yaratadi, shuning uchun modelga
+    keyinroq qo'shilgan ustunlar va indekslar shu yerda qo'shiladi.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = db.engine.dialect.identifier_preparer
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        missing_columns = [column for column in table.columns if column.name not in existing_columns]
+        if missing_columns:
+            with db.engine.begin() as conn:
+                for column in missing_columns:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(text(
+                        f'ALTER TABLE {preparer.format_table(table)} '
+                        f'ADD COLUMN {preparer.format_column(column)} {column_type}'
+                    ))
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                try:
+                    index.create(db.engine)
+                except DBAPIError as error:
+                    # Masalan unique indeks uchun takroriy qatorlar - ishga tushish to'xtamasin
+                    # (favorites uchun: flask rebuild-favorite-counts)
+                    print(f"⚠️ {index.name} indeksi yaratilmadi: {error.orig}")
@@ -4,5 +4,12 @@ from .tariff import UserTariff, PaymentRequest
 from .request import MatchRequest
 from .chat import Chat, Message
 from .favorite import Favorite
+from .listing_counter import ListingCounter
+from .user_pair import UserPair
+from .suggestion import DailySuggestion
+from .lookup import LookupValue
+from .profile_view import ProfileViewStat
 
-__all__ = ['User', 'Profile', 'UserTariff', 'PaymentRequest', 'MatchRequest', 'Chat', 'Message', 'Favorite']
+__all__ = ['User', 'Profile', 'UserTariff', 'PaymentRequest', 'MatchRequest', 'Chat', 'Message', 'Favorite',
+           'ListingCounter', 'UserPair', 'DailySuggestion', 'LookupValue',
+           'ProfileViewStat']
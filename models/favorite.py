@@ -1,10 +1,19 @@
 from database import db
+from services.cache import mark_changed
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
 
 
 class Favorite(db.Model):
-    """Favorite model - sevimlilar"""
+    """Favorite model - sevimlilar
+
+    Profile.favorited_count hisoblagichi add()/remove() bilan shu tranzaksiyada yangilanadi.
+    """
     __tablename__ = 'favorites'
+    __table_args__ = (
+        # Bir juftlik faqat bir marta (add() takroriy qo'shishni e'tiborsiz qoldiradi)
+        db.Index('uq_favorites_user', 'user_id', 'favorite_user_id', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -18,12 +27,55 @@ class Favorite(db.Model):
     def __repr__(self):
         return f'<Favorite {self.user_id} -> {self.favorite_user_id}>'
 
-    def to_dict(self):
-        """Favoriteni dictionary ga aylantirish"""
+    @classmethod
+    def add(cls, user_id, favorite_user_id):
+        """Sevimliga qo'shish (idempotent): (favorite_id, yangi qo'shildimi), profil faol bo'lmasa None
+
+        Hisoblagich avval oshiriladi - UPDATE ning rowcount'i profil mavjud va faolligini
+        ham tekshiradi. Juftlik allaqachon bo'lsa INSERT e'tiborsiz qoldiriladi va
+        hisoblagich qaytariladi. commit chaqiruvchida.
+        """
+        from models.profile import Profile
+        if not Profile.adjust_favorited_count(favorite_user_id, 1, active_only=True):
+            return None
+
+        result = db.session.execute(_insert_ignore(cls.__table__), {
+            'user_id': user_id, 'favorite_user_id': favorite_user_id, 'created_at': datetime.utcnow()
+        })
+        if result.rowcount:
+            # Core yozuvlar after_flush'dan o'tmaydi - feed keshlari (favorites_count) qo'lda belgilanadi
+            mark_changed(db.session, Favorite)
+            return result.inserted_primary_key[0], True
+
+        Profile.adjust_favorited_count(favorite_user_id, -1)
+        favorite_id = db.session.query(cls.id).filter_by(
+            user_id=user_id, favorite_user_id=favorite_user_id
+        ).scalar()
+        return favorite_id, False
+
+    def remove(self):
+        """Sevimlidan olib tashlash va hisoblagichni kamaytirish (commit chaqiruvchida)"""
+        from models.profile import Profile
+        Profile.adjust_favorited_count(self.favorite_user_id, -1)
+        mark_changed(db.session, Favorite)
+        db.session.delete(self)
+
+    def to_dict(self, fields=None):
+        """Favoriteni dictionary ga aylantirish (fields - profil kalitlari, Profile.to_dict ga qarang)"""
         return {
             'id': self.id,
             'user_id': self.user_id,
             'favorite_user_id': self.favorite_user_id,
-            'favorite_user': self.favorite_user.profile.to_dict() if self.favorite_user and self.favorite_user.profile else None,
+            'favorite_user': self.favorite_user.profile.to_dict(fields) if self.favorite_user and self.favorite_user.profile else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+def _insert_ignore(table):
+    """Unique cheklovga urilganda hech narsa qilmaydigan INSERT (rowcount 0)"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        return table.insert().prefix_with('IGNORE')
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    return sqlite.insert(table).on_conflict_do_nothing()
@@ -0,0 +1,109 @@
+from database import db
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+class ListingCounter(db.Model):
+    """ListingCounter model - jins bo'yicha faol e'lonlar soni (tranzaksiya ichida yangilanadi)"""
+    __tablename__ = 'listing_counters'
+
+    gender = db.Column(db.String(10), primary_key=True)
+    active_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ListingCounter {self.gender}: {self.active_count}>'
+
+    @classmethod
+    def active_count_for(cls, gender):
+        """Jins bo'yicha faol e'lonlar soni (jadval init_db da seed() bilan to'ldiriladi)"""
+        counter = db.session.get(cls, gender)
+        return counter.active_count if counter else 0
+
+    @classmethod
+    def active_counts(cls):
+        """Barcha jinslar bo'yicha faol e'lonlar soni"""
+        return {counter.gender: counter.active_count for counter in cls.query.all()}
+
+    @classmethod
+    def seed(cls):
+        """Bo'sh jadvalni profiles dan to'ldirish (init_db, birinchi profil flush'idan oldin)
+
+        Aks holda flush faqat o'zgargan jins uchun qisman qator qo'shadi va qolgan
+        jinslar 0 ko'rinadi. Buzilgan hisoblagichlar: flask rebuild-listing-counters.
+        """
+        if cls.query.first() is not None:
+            return
+        try:
+            cls.rebuild()
+        except IntegrityError:
+            # Boshqa worker bir vaqtda to'ldirdi
+            db.session.rollback()
+
+    @classmethod
+    def rebuild(cls):
+        """Hisoblagichlarni profiles jadvalidan qayta hisoblash"""
+        from models.profile import Profile
+        counts = dict(
+            db.session.query(Profile.gender, db.func.count(Profile.id)).filter(
+                Profile.is_active == True,
+                Profile.gender.isnot(None)
+            ).group_by(Profile.gender).all()
+        )
+        cls.query.delete()
+        for gender, count in counts.items():
+            db.session.add(cls(gender=gender, active_count=count))
+        db.session.commit()
+        return counts
+
+
+def _listing_state(state, attribute):
+    """Atributning flush'dan oldingi qiymati"""
+    history = state.attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_listing_counters(session, flush_context):
+    """Profil faollashtirilganda, o'chirilganda yoki jinsi o'zgarganda hisoblagichlarni yangilash"""
+    from models.profile import Profile
+
+    deltas = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Profile):
+            continue
+        state = inspect(obj)
+        if obj not in session.new and obj not in session.deleted and not (
+            state.attrs.is_active.history.has_changes() or state.attrs.gender.history.has_changes()
+        ):
+            continue
+
+        if obj in session.new:
+            old_active, old_gender = False, None
+        else:
+            old_active, old_gender = _listing_state(state, 'is_active'), _listing_state(state, 'gender')
+
+        if obj in session.deleted:
+            new_active, new_gender = False, None
+        else:
+            new_active, new_gender = obj.is_active, obj.gender
+
+        if old_active and old_gender:
+            deltas[old_gender] = deltas.get(old_gender, 0) - 1
+        if new_active and new_gender:
+            deltas[new_gender] = deltas.get(new_gender, 0) + 1
+
+    connection = session.connection()
+    table = ListingCounter.__table__
+    for gender, delta in deltas.items():
+        if not delta:
+            continue
+        result = connection.execute(
+            table.update().where(table.c.gender == gender).values(active_count=table.c.active_count + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(gender=gender, active_count=max(delta, 0)))
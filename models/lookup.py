@@ -0,0 +1,159 @@
+from database import db
+from sqlalchemy import inspect, types
+
+# Lookup lug'atlari: tur -> qiymatlar (kod = tartib raqami, 1 dan boshlanadi)
+# Kodlar bazada saqlanadi - ro'yxatlarga faqat oxiridan qo'shish mumkin
+LOOKUPS = {
+    'region': (
+        'Toshkent shahar', 'Toshkent viloyati', 'Samarqand', 'Buxoro', 'Andijon', "Farg'ona", 'Namangan',
+        'Qashqadaryo', 'Surxondaryo', 'Xorazm', 'Navoiy', 'Jizzax', 'Sirdaryo', "Qoraqalpog'iston", 'Istalgan'
+    ),
+    'nationality': ("O'zbek", 'Rus', 'Tojik', 'Qozoq', 'Qoraqalpoq', 'Boshqa'),
+    'marital_status': ("Bo'ydoq", 'Ajrashgan', 'Istalgan'),
+    # Doimiy / O'qimaydi - eski anketadagi qiymatlar
+    'prays': ('Ha', "Ba'zan", "Yo'q", 'Doimiy', "O'qimaydi"),
+    'fasts': ('Ha', "Ba'zan", "Yo'q"),
+    # Past / Yuqori - eski anketadagi qiymatlar
+    'religious_level': ('Jiddiy', "O'rtacha", 'Yengil', 'Istalgan', 'Past', 'Yuqori'),
+    'education': ('Oliy', "O'rta maxsus", "O'rta"),
+    'request_status': ('pending', 'accepted', 'rejected', 'cancelled'),
+    'payment_status': ('pending', 'approved', 'rejected'),
+    # TOP_<kun> - faqat TOP tariflari (1-30 kun)
+    'tariff_name': ('KUMUSH', 'OLTIN', 'VIP') + tuple(f'TOP_{days}' for days in range(1, 31)),
+}
+
+
+class CodedString(types.TypeDecorator):
+    """Bazada SMALLINT kod, Python va API da matn sifatida ko'rinadigan ustun turi
+
+    Filterlar (Profile.region == 'Buxoro') ham kodga aylantiriladi, shuning uchun
+    so'rovlar va to_dict() o'zgarmaydi. Lug'atda yo'q qiymat yozilmaydi (ValueError).
+    """
+
+    impl = types.SmallInteger
+    cache_ok = True
+
+    def __init__(self, kind):
+        super().__init__()
+        self.kind = kind
+        self.values = LOOKUPS[kind]
+        self.codes = {value: code for code, value in enumerate(self.values, start=1)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None or value == '':
+            return None
+        code = self.codes.get(value)
+        if code is None:
+            raise ValueError(f"{self.kind}: noma'lum qiymat {value!r}")
+        return code
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str) and not value.isdigit():
+            # Hali migratsiya qilinmagan matnli qiymat (flask encode-lookup-columns)
+            return value
+        # SQLite da migratsiya qilingan eski VARCHAR ustunlar kodni matn ('3') sifatida qaytaradi
+        code = int(value)
+        if 1 <= code <= len(self.values):
+            return self.values[code - 1]
+        return None
+
+
+class LookupValue(db.Model):
+    """LookupValue model - kodlarning matnli qiymatlari (SQL hisobotlar uchun JOIN jadvali)"""
+    __tablename__ = 'lookup_values'
+
+    kind = db.Column(db.String(30), primary_key=True)
+    code = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    value = db.Column(db.String(100), nullable=False)
+
+    def __repr__(self):
+        return f'<LookupValue {self.kind}:{self.code} {self.value}>'
+
+    @classmethod
+    def sync(cls):
+        """lookup_values jadvalini LOOKUPS lug'atlari bilan moslashtirish"""
+        existing = {(row.kind, row.code): row for row in cls.query.all()}
+        for kind, values in LOOKUPS.items():
+            for code, value in enumerate(values, start=1):
+                row = existing.get((kind, code))
+                if row is None:
+                    db.session.add(cls(kind=kind, code=code, value=value))
+                elif row.value != value:
+                    row.value = value
+        db.session.commit()
+
+
+def coded_columns():
+    """CodedString turidagi barcha (jadval, ustun) juftliklari"""
+    return [
+        (table, column)
+        for table in db.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, CodedString)
+    ]
+
+
+def encode_text_columns(null_unknown=False):
+    """Eski VARCHAR lookup ustunlaridagi matnlarni kodlarga o'tkazish (migratsiya)
+
+    Lug'atda yo'q qiymat topilsa hech narsa o'zgartirilmaydi va ular qaytariladi
+    (null_unknown=True bo'lsa NULL qilinadi). MySQL/PostgreSQL da ustun turi SMALLINT
+    ga o'zgartiriladi; SQLite da kodlar mavjud ustunda saqlanadi.
+    Qaytaradi: (migratsiya qilingan ustunlar, {(jadval, ustun): noma'lum qiymatlar}).
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    dialect = db.engine.dialect.name
+    preparer = db.engine.dialect.identifier_preparer
+
+    pending = []
+    unknown = {}
+    for table, column in coded_columns():
+        if table.name not in existing_tables:
+            continue
+        db_types = {info['name']: info['type'] for info in inspector.get_columns(table.name)}
+        if column.name not in db_types or isinstance(db_types[column.name], types.Integer):
+            # Yangi ustun (upgrade_schema qo'shadi) yoki allaqachon kodlangan
+            continue
+
+        # Kodlanmagan ustun matn sifatida o'qiladi
+        raw = db.column(column.name, db.String)
+        code_strings = [str(code) for code in column.type.codes.values()]
+        with db.engine.connect() as conn:
+            values = [value for (value,) in conn.execute(db.select(raw).select_from(table).distinct())]
+        bad_values = sorted(
+            value for value in values
+            if value not in (None, '') and value not in column.type.codes and value not in code_strings
+        )
+        if bad_values:
+            unknown[(table.name, column.name)] = bad_values
+        pending.append((table, column, raw, code_strings))
+
+    if unknown and not null_unknown:
+        return [], unknown
+
+    migrated = []
+    for table, column, raw, code_strings in pending:
+        with db.engine.begin() as conn:
+            conn.execute(table.update().where(raw.in_(list(column.type.codes))).values({
+                column.name: db.case(
+                    {value: str(code) for value, code in column.type.codes.items()}, value=raw
+                )
+            }))
+            conn.execute(table.update().where(db.or_(raw == '', raw.notin_(code_strings))).values({
+                column.name: None
+            }))
+
+            table_name, column_name = preparer.format_table(table), preparer.format_column(column)
+            if dialect == 'mysql':
+                conn.execute(db.text(f'ALTER TABLE {table_name} MODIFY {column_name} SMALLINT NULL'))
+            elif dialect == 'postgresql':
+                conn.execute(db.text(
+                    f'ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE SMALLINT '
+                    f'USING {column_name}::smallint'
+                ))
+        migrated.append(f'{table.name}.{column.name}')
+
+    return migrated, unknown
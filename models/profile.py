@@ -1,47 +1,79 @@
 from database import db
+from models.lookup import CodedString
+from services.cache import TTLCache
+from services.photos import photo_store
+from config import Config
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
 from datetime import datetime
 
+# Serializatsiya qilingan profillar keshi: profile.id -> (versiya, to_dict() natijasi)
+# Versiya (Profile.version, joriy yil) - yosh yil almashganda qayta hisoblanadi
+serialized_profiles = TTLCache(ttl=Config.PROFILE_DICT_CACHE_TTL, max_entries=Config.PROFILE_DICT_CACHE_SIZE)
+
 
 class Profile(db.Model):
     """Profile model - foydalanuvchi profili"""
     __tablename__ = 'profiles'
+    __table_args__ = (
+        # Feed: faol e'lonlar jins bo'yicha, yangilari birinchi
+        db.Index('ix_profiles_feed', 'is_active', 'gender', 'activated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
 
     # 5.1 Shaxsiy ma'lumotlar
     name = db.Column(db.String(100))
-    gender = db.Column(db.String(10))  # Erkak / Ayol
+    # active_history: eski qiymat listing_counters hisoblagichlari uchun kerak
+    gender = db.column_property(db.Column(db.String(10)), active_history=True)  # Erkak / Ayol
     birth_year = db.Column(db.Integer)
-    region = db.Column(db.String(100))  # Viloyat/Shahar
-    nationality = db.Column(db.String(50))
-    marital_status = db.Column(db.String(20))  # Bo'ydoq / Ajrashgan
+    # Lookup ustunlari bazada SMALLINT kod sifatida saqlanadi (models/lookup.py)
+    region = db.Column(CodedString('region'))  # Viloyat/Shahar
+    nationality = db.Column(CodedString('nationality'))
+    marital_status = db.Column(CodedString('marital_status'))  # Bo'ydoq / Ajrashgan
 
     # 5.2 Jismoniy ma'lumotlar
     height = db.Column(db.Integer)  # Bo'y (sm)
     weight = db.Column(db.Integer)  # Vazn (kg)
 
     # 5.3 Diniy ma'lumotlar
-    prays = db.Column(db.String(20))  # Doimiy / Ba'zan / O'qimaydi
-    fasts = db.Column(db.String(10))  # Ha / Yo'q
-    religious_level = db.Column(db.String(20))  # Past / O'rtacha / Yuqori
+    prays = db.Column(CodedString('prays'))  # Ha / Ba'zan / Yo'q
+    fasts = db.Column(CodedString('fasts'))  # Ha / Ba'zan / Yo'q
+    religious_level = db.Column(CodedString('religious_level'))  # Jiddiy / O'rtacha / Yengil
 
     # 5.4 Ta'lim va kasb
-    education = db.Column(db.String(100))
+    education = db.Column(CodedString('education'))
     profession = db.Column(db.String(100))
     is_working = db.Column(db.Boolean)
 
     # 5.5 Juftga qo'yiladigan talablar
     partner_age_min = db.Column(db.Integer)
     partner_age_max = db.Column(db.Integer)
-    partner_region = db.Column(db.String(100))
-    partner_religious_level = db.Column(db.String(20))
-    partner_marital_status = db.Column(db.String(20))
+    partner_region = db.Column(CodedString('region'))
+    partner_religious_level = db.Column(CodedString('religious_level'))
+    partner_marital_status = db.Column(CodedString('marital_status'))
 
     # 6. E'lon ma'lumotlari
     bio = db.Column(db.Text)  # Qisqa tavsif
-    is_active = db.Column(db.Boolean, default=False)  # E'lon aktiv/passiv
+    photo_hash = db.Column(db.String(64))  # Rasm sha256 hash'i (services/photos.py)
+
+    # Ko'rishlar (services/view_counter.py guruhlab yangilaydi, updated_at o'zgarmaydi)
+    views_count = db.Column(db.Integer, default=0)
+    unique_viewers = db.Column(db.Integer, default=0)  # Oxirgi UNIQUE_VIEWERS_DAYS kun, taxminiy
+    favorited_count = db.Column(db.Integer, default=0)  # Sevimliga qo'shganlar (Favorite.add/remove)
+    is_active = db.column_property(db.Column(db.Boolean, default=False), active_history=True)  # E'lon aktiv/passiv
     activated_at = db.Column(db.DateTime)
+    # TOP muddati (aktiv TOP tariflardan denormalizatsiya qilingan, feed saralash uchun)
+    top_until = db.Column(db.DateTime, index=True)
+
+    # To'liqlik (before_flush hook'ida yangilanadi, SQL da filterlash uchun)
+    is_complete = db.Column(db.Boolean, default=False, index=True)
+    completion_pct = db.Column(db.Integer, default=0)
+
+    # to_dict() keshi versiyasi - har bir ORM o'zgarishida bazada oshiriladi (before_flush).
+    # updated_at soniyagacha yaxlitlanadi, bir soniyadagi ikki o'zgarish bir xil bo'lib qoladi
+    version = db.Column(db.Integer, default=0)
 
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -50,33 +82,16 @@ class Profile(db.Model):
     def __repr__(self):
         return f'<Profile {self.name}>'
 
-    @property
-    def is_complete(self):
-        """Profil to'liq to'ldirilganmi?"""
-        required_fields = [
-            self.name, self.gender, self.birth_year, self.region,
-            self.nationality, self.marital_status, self.height, self.weight,
-            self.prays, self.fasts, self.religious_level,
-            self.education, self.profession, self.is_working is not None,
-            self.partner_age_min, self.partner_age_max,
-            self.partner_region, self.partner_religious_level,
-            self.partner_marital_status
-        ]
-        return all(required_fields)
-
-    @property
-    def age(self):
-        """Yoshni hisoblash"""
-        if self.birth_year:
-            current_year = datetime.utcnow().year
-            return current_year - self.birth_year
-        return None
+    @db.validates('region', 'nationality', 'marital_status', 'prays', 'fasts', 'religious_level', 'education',
+                  'partner_region', 'partner_religious_level', 'partner_marital_status')
+    def _validate_lookup(self, key, value):
+        """Lookup ustunlariga faqat lug'atdagi qiymat (xato flush'gacha, o'zlashtirish paytida)"""
+        self.__table__.c[key].type.process_bind_param(value, None)
+        return value
 
-    @property
-    def completion_percentage(self):
-        """Profil to'liq to'ldirilganlik foizi"""
-        total_fields = 19
-        filled_fields = sum([
+    def _filled_fields(self):
+        """To'ldirilgan majburiy maydonlar soni (REQUIRED_FIELDS_COUNT dan)"""
+        return sum([
             bool(self.name),
             bool(self.gender),
             bool(self.birth_year),
@@ -97,21 +112,182 @@ class Profile(db.Model):
             bool(self.partner_religious_level),
             bool(self.partner_marital_status)
         ])
-        return int((filled_fields / total_fields) * 100)
+
+    def refresh_completion(self):
+        """is_complete va completion_pct ustunlarini qayta hisoblash"""
+        filled_fields = self._filled_fields()
+        self.completion_pct = int((filled_fields / REQUIRED_FIELDS_COUNT) * 100)
+        self.is_complete = filled_fields == REQUIRED_FIELDS_COUNT
+
+    @property
+    def is_top(self):
+        """E'lon hozir TOP dami? (top_until ustunidan, tarif so'rovisiz)"""
+        return self.top_until is not None and self.top_until > datetime.utcnow()
+
+    @property
+    def age(self):
+        """Yoshni hisoblash"""
+        if self.birth_year:
+            current_year = datetime.utcnow().year
+            return current_year - self.birth_year
+        return None
+
+    @property
+    def completion_percentage(self):
+        """Profil to'liq to'ldirilganlik foizi (completion_pct ustunidan)"""
+        if self.completion_pct is None:
+            # Backfill qilinmagan eski profil
+            return int((self._filled_fields() / REQUIRED_FIELDS_COUNT) * 100)
+        return self.completion_pct
+
+    def sync_top_until(self):
+        """TOP muddatini foydalanuvchining aktiv TOP tariflaridan qayta hisoblash"""
+        from models.tariff import UserTariff
+        self.top_until = db.session.query(db.func.max(top_until_expression())).filter(
+            UserTariff.user_id == self.user_id,
+            UserTariff.is_active == True,
+            UserTariff.is_top == True
+        ).scalar()
+
+    @classmethod
+    def seed_completion(cls):
+        """is_complete/completion_pct bo'sh profillarni hisoblash (init_db)
+
+        Mavjud bazada ustunlar qo'shilgandan keyin - aks holda is_complete bo'yicha
+        filtrlovchi so'rovlar (admin statistikasi, kunlik tavsiyalar) eski profillarni
+        o'tkazib yuboradi. Qaytaradi: yangilangan profillar soni.
+        """
+        profiles = cls.query.filter(db.or_(cls.is_complete.is_(None), cls.completion_pct.is_(None))).all()
+        for profile in profiles:
+            profile.refresh_completion()
+        if profiles:
+            db.session.commit()
+        return len(profiles)
+
+    @classmethod
+    def seed_top_until(cls):
+        """Aktiv TOP tarifi bor, lekin top_until bo'sh profillarni to'ldirish (init_db)
+
+        Mavjud bazada ustun qo'shilgandan keyin - aks holda TOP sotib olganlar feed'da
+        TOP bo'lmaydi. Qaytaradi: yangilangan profillar soni.
+        """
+        from models.tariff import UserTariff
+        profiles = cls.query.filter(
+            cls.top_until.is_(None),
+            cls.user_id.in_(db.select(UserTariff.user_id).where(
+                UserTariff.is_active == True,
+                UserTariff.is_top == True
+            ))
+        ).all()
+        for profile in profiles:
+            profile.sync_top_until()
+        if profiles:
+            db.session.commit()
+        return len(profiles)
 
     def activate(self):
         """E'lonni faollashtirish"""
         self.is_active = True
         self.activated_at = datetime.utcnow()
+        self.sync_top_until()
         db.session.commit()
 
     def deactivate(self):
         """E'lonni deaktiv qilish"""
         self.is_active = False
+        self.sync_top_until()
         db.session.commit()
 
-    def to_dict(self):
-        """Profilni dictionary ga aylantirish"""
+    @classmethod
+    def adjust_favorited_count(cls, user_id, delta, active_only=False):
+        """favorited_count ni joriy tranzaksiyada atomar o'zgartirish. Qaytaradi: profil topildimi
+
+        updated_at o'zgartirilmaydi (to_dict keshi hisoblagichni ustundan o'qiydi).
+        """
+        table = cls.__table__
+        count = db.func.coalesce(table.c.favorited_count, 0)
+        statement = table.update().where(table.c.user_id == user_id).values(
+            favorited_count=db.case((count + delta > 0, count + delta), else_=0),
+            updated_at=table.c.updated_at
+        )
+        if active_only:
+            statement = statement.where(table.c.is_active == True)
+        return db.session.execute(statement).rowcount > 0
+
+    def _field_value(self, field):
+        """to_dict() dagi bitta kalit qiymati"""
+        if field == 'age':
+            return self.age
+        if field == 'location':
+            return self.region
+        if field == 'completion_percentage':
+            return self.completion_percentage
+        if field == 'photo_url':
+            return photo_store.url(self.photo_hash, 'full')
+        if field == 'photo_thumb_url':
+            return photo_store.url(self.photo_hash, 'thumb')
+        if field == 'salary':
+            return None
+        if field in ('views_count', 'unique_viewers'):
+            return getattr(self, field) or 0
+        if field == 'favorites_count':
+            return self.favorited_count or 0
+        return getattr(self, field)
+
+    @classmethod
+    def fields_from_args(cls, args):
+        """?view=card yoki ?fields=a,b parametrlaridan kalitlar ro'yxati (None - to'liq profil)"""
+        if args.get('view') == 'card':
+            return CARD_FIELDS
+        fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+        fields = [field for field in fields if field in SERIALIZED_FIELDS]
+        return tuple(fields) if fields else None
+
+    @classmethod
+    def columns_for(cls, fields):
+        """Kalitlar uchun yuklanadigan ustunlar (load_only uchun)"""
+        names = set(ALWAYS_LOADED_COLUMNS)
+        for field in fields:
+            names.update(FIELD_COLUMNS.get(field, (field,)))
+        return [getattr(cls, name) for name in sorted(names)]
+
+    def _cached_dict(self):
+        """Keshdagi to_dict() natijasi (versiya mos kelsa), aks holda (None, versiya)"""
+        if self.id is None or inspect(self).modified:
+            # Yangi yoki saqlanmagan o'zgarishli profil keshlanmaydi
+            return None, None
+        version = (self.version or 0, datetime.utcnow().year)
+        cached = serialized_profiles.get(self.id)
+        if cached is not None and cached[0] == version:
+            return cached[1], version
+        return None, version
+
+    def to_dict(self, fields=None):
+        """Profilni dictionary ga aylantirish
+
+        Natija (id, version) bo'yicha keshlanadi - ro'yxatlarda asosan keshdagi
+        dict nusxalanadi. fields berilsa faqat shu kalitlar qaytariladi (masalan
+        CARD_FIELDS) va boshqa ustunlarga murojaat qilinmaydi - load_only bilan
+        yuklangan profillar uchun.
+        """
+        cached, version = self._cached_dict()
+        if fields is not None:
+            if cached is not None:
+                return {
+                    field: self._field_value(field) if field in COUNTER_FIELDS else cached[field]
+                    for field in fields
+                }
+            return {field: self._field_value(field) for field in fields}
+
+        if cached is None:
+            cached = self._serialize()
+            if version is not None:
+                serialized_profiles.set(self.id, (version, cached))
+        # Hisoblagichlar versiyani o'zgartirmaydi - keshdagi qiymat ustiga yoziladi
+        return dict(cached, **{field: self._field_value(field) for field in COUNTER_FIELDS})
+
+    def _serialize(self):
+        """to_dict() natijasini hisoblash (keshsiz)"""
         # Generate unique gradient background based on user_id
         import hashlib
         user_id_str = str(self.user_id)
@@ -151,8 +327,82 @@ class Profile(db.Model):
             'partner_region': self.partner_region,
             'partner_religious_level': self.partner_religious_level,
             'partner_marital_status': self.partner_marital_status,
-            'photo_url': None,  # Will be generated on frontend using gradient
+            'photo_url': photo_store.url(self.photo_hash, 'full'),  # None - frontend gradient chizadi
+            'photo_thumb_url': photo_store.url(self.photo_hash, 'thumb'),  # Feed kartalari uchun
             'salary': None,  # Not stored in profile, will be calculated if needed
-            'views_count': 0,  # Placeholder
-            'favorites_count': 0  # Placeholder
+            'views_count': self.views_count or 0,
+            'unique_viewers': self.unique_viewers or 0,
+            'favorites_count': self.favorited_count or 0
         }
+
+
+@event.listens_for(Session, 'before_flush')
+def _refresh_profile_completion(session, flush_context, instances):
+    """Yangi va o'zgargan profillarning to'liqlik ustunlarini yangilash"""
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Profile):
+            obj.refresh_completion()
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_profile_version(session, flush_context, instances):
+    """O'zgargan profillar versiyasini bazada atomar oshirish (boshqa worker'lar keshi ham eskiradi)"""
+    for obj in session.dirty:
+        if isinstance(obj, Profile) and session.is_modified(obj, include_collections=False):
+            obj.version = db.func.coalesce(Profile.version, 0) + 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _discard_serialized_profiles(session, flush_context):
+    """O'zgargan profillar keshini shu worker'da darhol tashlash (versiya keyingi o'qishda yuklanadi)"""
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Profile) and obj.id is not None:
+            serialized_profiles.discard(obj.id)
+
+
+# top_expires_at NULL bo'lgan TOP tarif muddatsiz TOP hisoblanadi (eski feed so'rovidagi kabi)
+TOP_UNLIMITED = datetime(9999, 12, 31)
+
+
+def top_until_expression():
+    """Tarifning TOP muddati: top_expires_at, NULL bo'lsa TOP_UNLIMITED"""
+    from models.tariff import UserTariff
+    return db.func.coalesce(UserTariff.top_expires_at, TOP_UNLIMITED)
+
+
+# is_complete/completion_pct hisoblanadigan majburiy maydonlar soni
+REQUIRED_FIELDS_COUNT = 19
+
+# to_dict() ning barcha kalitlari
+SERIALIZED_FIELDS = (
+    'id', 'name', 'age', 'gender', 'region', 'location', 'nationality', 'marital_status',
+    'height', 'weight', 'prays', 'fasts', 'religious_level', 'education', 'profession',
+    'is_working', 'bio', 'is_active', 'completion_percentage',
+    'partner_age_min', 'partner_age_max', 'partner_region', 'partner_religious_level',
+    'partner_marital_status', 'photo_url', 'photo_thumb_url', 'salary', 'views_count', 'unique_viewers',
+    'favorites_count'
+)
+
+# Hisoblagichlar (ko'rishlar, sevimlilar) - keshdagi dict ustiga har safar ustundan o'qiladi
+COUNTER_FIELDS = ('views_count', 'unique_viewers', 'favorites_count')
+
+# Ro'yxatlardagi kartalar uchun ixcham ko'rinish (?view=card)
+CARD_FIELDS = (
+    'id', 'name', 'age', 'gender', 'region', 'nationality', 'marital_status', 'height', 'weight',
+    'religious_level', 'education', 'profession', 'is_working', 'photo_url', 'photo_thumb_url',
+    'views_count', 'favorites_count'
+)
+
+# Ustun nomidan farq qiladigan kalitlar uchun kerakli ustunlar
+FIELD_COLUMNS = {
+    'age': ('birth_year',),
+    'location': ('region',),
+    'completion_percentage': ('completion_pct',),
+    'photo_url': ('photo_hash',),
+    'photo_thumb_url': ('photo_hash',),
+    'salary': (),
+    'favorites_count': ('favorited_count',),
+}
+
+# Route'lar har doim ishlatadigan ustunlar (user_id, TOP, tartib)
+ALWAYS_LOADED_COLUMNS = ('id', 'user_id', 'is_active', 'activated_at', 'top_until', 'updated_at', 'version')
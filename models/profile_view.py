@@ -0,0 +1,49 @@
+from database import db
+from services.hyperloglog import HyperLogLog
+from datetime import datetime, timedelta
+
+
+class ProfileViewStat(db.Model):
+    """ProfileViewStat model - profil ko'rishlari kun bo'yicha (services/view_counter.py yozadi)
+
+    unique_sketch - noyob ko'ruvchilar HyperLogLog registrlari; kunlar sketch'larini
+    birlashtirib istalgan davr uchun noyob ko'ruvchilar baholanadi.
+    """
+    __tablename__ = 'profile_view_stats'
+    __table_args__ = (
+        db.UniqueConstraint('profile_id', 'view_date', name='uq_profile_view_stats_day'),
+        # Admin panel: kun bo'yicha eng ko'p ko'rilganlar
+        db.Index('ix_profile_view_stats_date', 'view_date', 'views'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    profile_id = db.Column(db.Integer, db.ForeignKey('profiles.id'), nullable=False)
+    view_date = db.Column(db.Date, nullable=False)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    unique_sketch = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f'<ProfileViewStat {self.profile_id} {self.view_date}: {self.views}>'
+
+    @property
+    def unique_viewers(self):
+        """Shu kungi noyob ko'ruvchilar (taxminiy)"""
+        return HyperLogLog.from_bytes(self.unique_sketch).estimate()
+
+    @classmethod
+    def summary(cls, profile_ids, days):
+        """Oxirgi days kun bo'yicha {profile_id: (ko'rishlar, noyob ko'ruvchilar)}"""
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        views, sketches = {}, {}
+        rows = db.session.query(cls.profile_id, cls.views, cls.unique_sketch).filter(
+            cls.profile_id.in_(profile_ids),
+            cls.view_date >= since
+        )
+        for profile_id, day_views, unique_sketch in rows:
+            views[profile_id] = views.get(profile_id, 0) + day_views
+            sketch = HyperLogLog.from_bytes(unique_sketch)
+            if profile_id in sketches:
+                sketches[profile_id].merge(sketch)
+            else:
+                sketches[profile_id] = sketch
+        return {profile_id: (views[profile_id], sketches[profile_id].estimate()) for profile_id in views}
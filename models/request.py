@@ -1,4 +1,5 @@
 from database import db
+from models.lookup import CodedString
 from datetime import datetime
 
 
@@ -12,7 +13,7 @@ class MatchRequest(db.Model):
 
     # So'rov ma'lumotlari
     message = db.Column(db.Text)  # Qo'shimcha xabar (ixtiyoriy)
-    status = db.Column(db.String(20), default='pending')  # pending / accepted / rejected / cancelled
+    status = db.Column(CodedString('request_status'), default='pending')  # pending / accepted / rejected / cancelled
 
     # Vaqtlar
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -44,6 +45,14 @@ class MatchRequest(db.Model):
         """So'rov bekor qilinganmi?"""
         return self.status == 'cancelled'
 
+    def sync_pair(self, chat=None):
+        """user_pairs jadvalidagi juftlik holatini shu so'rovga moslash"""
+        from models.user_pair import UserPair
+        pair = UserPair.between(self.sender_id, self.receiver_id)
+        if pair is None:
+            pair = UserPair.open(self)
+        pair.update_from(self, chat=chat)
+
     def accept(self):
         """So'rovni qabul qilish"""
         from models.chat import Chat
@@ -58,6 +67,7 @@ class MatchRequest(db.Model):
             user2_id=self.receiver_id
         )
         db.session.add(new_chat)
+        self.sync_pair(chat=new_chat)
         db.session.commit()
 
         return new_chat
@@ -66,6 +76,7 @@ class MatchRequest(db.Model):
         """So'rovni rad etish"""
         self.status = 'rejected'
         self.responded_at = datetime.utcnow()
+        self.sync_pair()
         db.session.commit()
 
     def cancel(self):
@@ -73,12 +84,13 @@ class MatchRequest(db.Model):
         if self.is_pending:
             self.status = 'cancelled'
             self.responded_at = datetime.utcnow()
+            self.sync_pair()
             db.session.commit()
             return True
         return False
 
-    def to_dict(self):
-        """So'rovni dictionary ga aylantirish"""
+    def to_dict(self, fields=None):
+        """So'rovni dictionary ga aylantirish (fields - profil kalitlari, Profile.to_dict ga qarang)"""
         chat_data = None
         if self.chat:
             chat_data = {
@@ -91,7 +103,7 @@ class MatchRequest(db.Model):
         # Sender ma'lumotlari
         sender_data = None
         if self.sender and self.sender.profile:
-            sender_data = self.sender.profile.to_dict()
+            sender_data = self.sender.profile.to_dict(fields)
             sender_data['user_id'] = self.sender.id
             # Sender'ning aktiv tarifidagi so'rovlar soni
             if self.sender.has_active_tariff and self.sender.active_tariff:
@@ -102,7 +114,7 @@ class MatchRequest(db.Model):
         # Receiver ma'lumotlari
         receiver_data = None
         if self.receiver and self.receiver.profile:
-            receiver_data = self.receiver.profile.to_dict()
+            receiver_data = self.receiver.profile.to_dict(fields)
             receiver_data['user_id'] = self.receiver.id
             # Receiver'ning aktiv tarifidagi so'rovlar soni
             if self.receiver.has_active_tariff and self.receiver.active_tariff:
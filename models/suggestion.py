@@ -0,0 +1,34 @@
+from database import db
+from datetime import datetime
+
+
+class DailySuggestion(db.Model):
+    """DailySuggestion model - tungi hisoblangan kunlik tavsiyalar (top-K moslik)"""
+    __tablename__ = 'daily_suggestions'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'batch_date', 'suggested_user_id', name='uq_daily_suggestions_user'),
+        # Digest yuborish: shu kungi hali yuborilmagan tavsiyalar
+        db.Index('ix_daily_suggestions_batch', 'batch_date', 'notified_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    suggested_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    batch_date = db.Column(db.Date, nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # 1 - eng mos
+    score = db.Column(db.Integer, nullable=False)  # Ikki tomonlama moslik bali (0..8)
+    notified_at = db.Column(db.DateTime)  # Bot orqali digest yuborilgan vaqt
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    suggested_user = db.relationship('User', foreign_keys=[suggested_user_id])
+
+    def __repr__(self):
+        return f'<DailySuggestion {self.user_id} -> {self.suggested_user_id} ({self.batch_date})>'
+
+    @classmethod
+    def latest_for(cls, user_id):
+        """Foydalanuvchining oxirgi hisoblangan tavsiyalari (tartib bo'yicha)"""
+        latest_date = db.session.query(db.func.max(cls.batch_date)).filter(cls.user_id == user_id).scalar()
+        if latest_date is None:
+            return []
+        return cls.query.filter_by(user_id=user_id, batch_date=latest_date).order_by(cls.position).all()
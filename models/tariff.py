@@ -1,4 +1,5 @@
 from database import db
+from models.lookup import CodedString
 from datetime import datetime, timedelta
 
 
@@ -10,7 +11,7 @@ class UserTariff(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
     # Tarif ma'lumotlari
-    tariff_name = db.Column(db.String(50), default='KUMUSH')  # Hozircha faqat KUMUSH
+    tariff_name = db.Column(CodedString('tariff_name'), default='KUMUSH')  # KUMUSH / OLTIN / VIP / TOP_<kun>
     requests_count = db.Column(db.Integer, default=5)  # Qolgan so'rovlar soni
     total_requests = db.Column(db.Integer, default=5)  # Jami so'rovlar soni
 
@@ -40,8 +41,24 @@ class UserTariff(db.Model):
         self.activated_at = datetime.utcnow()
         self.expires_at = datetime.utcnow() + timedelta(days=self.duration_days)
         self.top_expires_at = datetime.utcnow() + timedelta(days=self.top_duration_days)
+        self.sync_profile_rank()
+        self.sync_user_tariff()
         db.session.commit()
 
+    def sync_profile_rank(self):
+        """Profildagi TOP muddatini (feed reytingi) yangilash"""
+        from models.profile import Profile
+        profile = Profile.query.filter_by(user_id=self.user_id).first()
+        if profile:
+            profile.sync_top_until()
+
+    def sync_user_tariff(self):
+        """Foydalanuvchidagi aktiv tarif ko'rsatkichini (active_tariff_id/active_until) yangilash"""
+        from models.user import User
+        user = db.session.get(User, self.user_id)
+        if user:
+            user.sync_active_tariff()
+
     def use_request(self):
         """So'rov ishlatish"""
         if self.requests_count > 0:
@@ -84,9 +101,12 @@ class UserTariff(db.Model):
         """Holatni tekshirish va yangilash"""
         if self.is_expired:
             self.is_active = False
+            self.sync_profile_rank()
+            self.sync_user_tariff()
             db.session.commit()
         if self.is_top_expired:
             self.is_top = False
+            self.sync_profile_rank()
             db.session.commit()
 
 
@@ -98,7 +118,7 @@ class PaymentRequest(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
     # To'lov ma'lumotlari
-    tariff_name = db.Column(db.String(50), default='KUMUSH')
+    tariff_name = db.Column(CodedString('tariff_name'), default='KUMUSH')
     amount = db.Column(db.Integer)  # To'lov summasi
 
     # Chek ma'lumotlari
@@ -106,7 +126,7 @@ class PaymentRequest(db.Model):
     receipt_message = db.Column(db.Text)  # Qo'shimcha xabar
 
     # Holat
-    status = db.Column(db.String(20), default='pending')  # pending / approved / rejected
+    status = db.Column(CodedString('payment_status'), default='pending')  # pending / approved / rejected
 
     # Admin
     reviewed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -14,6 +14,11 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_active = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Aktiv tarif ko'rsatkichi (sync_active_tariff yangilaydi) - has_active_tariff so'rovsiz.
+    # ForeignKey yo'q: users -> user_tariffs ikkinchi bog'lanishi tariffs relationship'ini noaniq qiladi
+    active_tariff_id = db.Column(db.Integer)
+    active_until = db.Column(db.DateTime)
+
     # Relationships
     profile = db.relationship('Profile', backref='user', uselist=False, cascade='all, delete-orphan')
     tariffs = db.relationship('UserTariff', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -29,30 +34,74 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.telegram_id}>'
 
-    @property
-    def has_active_tariff(self):
-        """Foydalanuvchining aktiv tarifi bormi?"""
+    @classmethod
+    def load_current(cls, user_id):
+        """Foydalanuvchini profili va aktiv tarifi bilan bitta so'rovda yuklash (routes/auth.py)"""
         from models.tariff import UserTariff
-        active_tariff = self.tariffs.filter(
+        row = db.session.query(cls, UserTariff).options(db.joinedload(cls.profile)).outerjoin(
+            UserTariff, UserTariff.id == cls.active_tariff_id
+        ).filter(cls.id == user_id).first()
+        if row is None:
+            return None
+        user, active_tariff = row
+        user._active_tariff = active_tariff
+        return user
+
+    def sync_active_tariff(self):
+        """Aktiv tarif ko'rsatkichini tariflardan qayta hisoblash (eng kech tugaydigan aktiv tarif)"""
+        from models.tariff import UserTariff
+        tariff = self.tariffs.filter(
             UserTariff.is_active == True,
             UserTariff.expires_at > datetime.utcnow()
-        ).first()
-        return active_tariff is not None
+        ).order_by(UserTariff.expires_at.desc()).first()
+        self.active_tariff_id = tariff.id if tariff else None
+        self.active_until = tariff.expires_at if tariff else None
+        self._active_tariff = tariff
+
+    @classmethod
+    def seed_active_tariffs(cls):
+        """Aktiv tarifi bor, lekin active_until bo'sh foydalanuvchilarni to'ldirish (init_db)
+
+        Mavjud bazada ustun qo'shilgandan keyin - aks holda to'lagan foydalanuvchilar
+        tarifsiz ko'rinadi. Qaytaradi: yangilangan foydalanuvchilar soni.
+        """
+        from models.tariff import UserTariff
+        users = cls.query.filter(
+            cls.active_until.is_(None),
+            cls.id.in_(db.select(UserTariff.user_id).where(
+                UserTariff.is_active == True,
+                UserTariff.expires_at > datetime.utcnow()
+            ))
+        ).all()
+        for user in users:
+            user.sync_active_tariff()
+        if users:
+            db.session.commit()
+        return len(users)
+
+    @property
+    def has_active_tariff(self):
+        """Foydalanuvchining aktiv tarifi bormi? (active_until ustunidan)"""
+        return self.active_until is not None and self.active_until > datetime.utcnow()
 
     @property
     def active_tariff(self):
-        """Aktiv tarifni qaytaradi"""
+        """Aktiv tarifni qaytaradi (load_current() yuklagan bo'lsa so'rovsiz)"""
+        if not self.has_active_tariff:
+            return None
+        if '_active_tariff' in self.__dict__:
+            return self._active_tariff
         from models.tariff import UserTariff
-        return self.tariffs.filter(
-            UserTariff.is_active == True,
-            UserTariff.expires_at > datetime.utcnow()
-        ).first()
+        return db.session.get(UserTariff, self.active_tariff_id)
 
     @property
     def profile_completed(self):
         """Profil to'liqmi?"""
         if not self.profile:
             return False
+        if self.profile.is_complete is None:
+            # Backfill qilinmagan eski profil
+            return self.profile.completion_percentage == 100
         return self.profile.is_complete
 
     def get_chats(self):
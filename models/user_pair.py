@@ -0,0 +1,108 @@
+from database import db
+from models.lookup import CodedString
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+
+
+class UserPair(db.Model):
+    """UserPair model - ikki foydalanuvchi orasidagi so'rov/chat holati
+
+    Juftlik kanonik ko'rinishda saqlanadi: (kichik id, katta id). Unique cheklov
+    bir juftlik uchun parallel ravishda ikkita so'rov yaratilishiga yo'l qo'ymaydi.
+    """
+    __tablename__ = 'user_pairs'
+    __table_args__ = (
+        db.UniqueConstraint('user_low_id', 'user_high_id', name='uq_user_pairs_users'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_high_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+
+    # Oxirgi so'rov holati
+    match_request_id = db.Column(db.Integer, db.ForeignKey('match_requests.id'))
+    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    status = db.Column(CodedString('request_status'))  # pending / accepted / rejected / cancelled
+    chat_id = db.Column(db.Integer, db.ForeignKey('chats.id'))
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    match_request = db.relationship('MatchRequest')
+    chat = db.relationship('Chat')
+
+    def __repr__(self):
+        return f'<UserPair {self.user_low_id}-{self.user_high_id} {self.status}>'
+
+    @staticmethod
+    def key(user_id, other_user_id):
+        """Juftlikning kanonik kaliti (kichik id, katta id)"""
+        return min(user_id, other_user_id), max(user_id, other_user_id)
+
+    @classmethod
+    def between(cls, user_id, other_user_id):
+        """Ikki foydalanuvchi orasidagi juftlik (bitta unique indeks bo'yicha qidiruv)"""
+        low, high = cls.key(user_id, other_user_id)
+        return cls.query.filter_by(user_low_id=low, user_high_id=high).first()
+
+    @classmethod
+    def for_user(cls, user_id, other_user_ids):
+        """Foydalanuvchining berilgan foydalanuvchilar bilan juftliklari: {other_user_id: UserPair}"""
+        other_user_ids = list(other_user_ids)
+        if not other_user_ids:
+            return {}
+
+        pairs = cls.query.filter(
+            db.or_(
+                db.and_(cls.user_low_id == user_id, cls.user_high_id.in_(other_user_ids)),
+                db.and_(cls.user_high_id == user_id, cls.user_low_id.in_(other_user_ids))
+            )
+        ).all()
+        return {pair.other_user_id(user_id): pair for pair in pairs}
+
+    @classmethod
+    def open(cls, match_request):
+        """Yangi so'rov uchun juftlik yaratish (commit'da juftlik allaqachon bo'lsa IntegrityError)"""
+        low, high = cls.key(match_request.sender_id, match_request.receiver_id)
+        pair = cls(user_low_id=low, user_high_id=high)
+        pair.update_from(match_request)
+        db.session.add(pair)
+        return pair
+
+    @classmethod
+    def rebuild(cls):
+        """Jadvalni match_requests dan qayta qurish (har juftlik uchun oxirgi so'rov). Qaytaradi: juftliklar soni"""
+        from models.request import MatchRequest
+        latest_by_pair = {}
+        for match_request in MatchRequest.query.order_by(MatchRequest.id).all():
+            latest_by_pair[cls.key(match_request.sender_id, match_request.receiver_id)] = match_request
+
+        cls.query.delete()
+        for match_request in latest_by_pair.values():
+            pair = cls.open(match_request)
+            pair.chat = match_request.chat
+        db.session.commit()
+        return len(latest_by_pair)
+
+    @classmethod
+    def seed(cls):
+        """Bo'sh jadvalni to'ldirish (init_db) - takroriy so'rov tekshiruvi va feed faqat shu jadvalni o'qiydi"""
+        from models.request import MatchRequest
+        if cls.query.first() is not None or MatchRequest.query.first() is None:
+            return
+        try:
+            cls.rebuild()
+        except IntegrityError:
+            # Boshqa worker bir vaqtda to'ldirdi
+            db.session.rollback()
+
+    def update_from(self, match_request, chat=None):
+        """Juftlik holatini so'rovdan yangilash"""
+        self.match_request = match_request
+        self.sender_id = match_request.sender_id
+        self.status = match_request.status or 'pending'
+        if chat is not None:
+            self.chat = chat
+
+    def other_user_id(self, user_id):
+        """Juftlikdagi boshqa foydalanuvchi ID si"""
+        return self.user_high_id if user_id == self.user_low_id else self.user_low_id
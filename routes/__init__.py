@@ -9,6 +9,7 @@ from .request import request_bp
 from .chat import chat_bp
 from .favorite import favorite_bp
 from .admin import admin_bp
+from .media import media_bp
 
 
 def register_blueprints(app):
@@ -21,3 +22,4 @@ def register_blueprints(app):
     app.register_blueprint(chat_bp)
     app.register_blueprint(favorite_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(media_bp)
@@ -1,9 +1,12 @@
-from flask import Blueprint, render_template, request, session, jsonify, redirect, url_for
-from models import User, Profile, PaymentRequest, UserTariff, MatchRequest, Chat
+from flask import Blueprint, render_template, request, session, g, jsonify, redirect, url_for
+from models import User, Profile, PaymentRequest, UserTariff, MatchRequest, Chat, ListingCounter, ProfileViewStat
+from models.lookup import LOOKUPS
 from database import db
-from routes.auth import login_required
+from routes.auth import login_required, load_current_user
+from services.singleflight import flights, single_flight
 from functools import wraps
 from sqlalchemy import func
+from datetime import datetime, timedelta
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -15,7 +18,7 @@ def admin_required(f):
         if 'user_id' not in session:
             return redirect(url_for('auth.index'))
 
-        user = User.query.get(session['user_id'])
+        user = load_current_user()
         if not user or not user.is_admin:
             return render_template('error.html',
                                  message='Sizda admin huquqi yo\'q'), 403
@@ -29,12 +32,12 @@ def admin_required(f):
 @admin_required
 def index():
     """Admin panel asosiy sahifa"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     # Statistika
     stats = {
         'total_users': User.query.count(),
-        'active_profiles': Profile.query.filter_by(is_active=True).count(),
+        'active_profiles': sum(ListingCounter.active_counts().values()),
         'pending_payments': PaymentRequest.query.filter_by(status='pending').count(),
         'active_chats': Chat.query.filter_by(is_active=True).count(),
         'total_requests': MatchRequest.query.count()
@@ -49,7 +52,7 @@ def index():
 @admin_required
 def users():
     """Foydalanuvchilar ro'yxati"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     page = request.args.get('page', 1, type=int)
     per_page = 50
@@ -67,7 +70,7 @@ def users():
 @admin_required
 def payments():
     """To'lov so'rovlari"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     status_filter = request.args.get('status', 'pending')
     page = request.args.get('page', 1, type=int)
@@ -75,8 +78,11 @@ def payments():
 
     query = PaymentRequest.query
 
-    if status_filter != 'all':
+    if status_filter in LOOKUPS['payment_status']:
         query = query.filter_by(status=status_filter)
+    elif status_filter != 'all':
+        # Noma'lum holat - bo'sh ro'yxat (kodlanmaydigan qiymat bilan filterlab bo'lmaydi)
+        query = query.filter(db.false())
 
     query = query.order_by(PaymentRequest.created_at.desc())
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -128,7 +134,7 @@ def unblock_user(user_id):
 @admin_required
 def approve_payment(payment_id):
     """To'lovni tasdiqlash"""
-    admin_user = User.query.get(session['user_id'])
+    admin_user = g.current_user
     payment = PaymentRequest.query.get(payment_id)
 
     if not payment:
@@ -154,7 +160,7 @@ def approve_payment(payment_id):
 @admin_required
 def reject_payment(payment_id):
     """To'lovni rad etish"""
-    admin_user = User.query.get(session['user_id'])
+    admin_user = g.current_user
     payment = PaymentRequest.query.get(payment_id)
 
     if not payment:
@@ -179,17 +185,42 @@ def reject_payment(payment_id):
 @admin_required
 def statistics():
     """Statistika"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
+    stats, region_stats = _collect_statistics()
+
+    return render_template('admin/statistics.html',
+                         user=user,
+                         stats=stats,
+                         region_stats=region_stats)
+
+
+@single_flight('admin_statistics', key=lambda: None)
+def _collect_statistics():
+    """Statistika hisoblash - bir vaqtda ochilgan sahifalar bitta hisoblashni kutadi"""
+    # Faol e'lonlar - listing_counters hisoblagichlaridan
+    active_counts = ListingCounter.active_counts()
+    now = datetime.utcnow()
 
     # Umumiy statistika
     stats = {
         'total_users': User.query.count(),
         'total_profiles': Profile.query.count(),
-        'active_profiles': Profile.query.filter_by(is_active=True).count(),
+        'active_profiles': sum(active_counts.values()),
         'inactive_profiles': Profile.query.filter_by(is_active=False).count(),
+        'complete_profiles': Profile.query.filter_by(is_complete=True).count(),
 
         'male_profiles': Profile.query.filter_by(gender='Erkak').count(),
         'female_profiles': Profile.query.filter_by(gender='Ayol').count(),
+        'active_male_profiles': active_counts.get('Erkak', 0),
+        'active_female_profiles': active_counts.get('Ayol', 0),
+
+        # TOP muddati vaqt o'tishi bilan tugaydi, shuning uchun top_until indeksi bo'yicha sanaladi
+        'top_male_profiles': Profile.query.filter(
+            Profile.is_active == True, Profile.gender == 'Erkak', Profile.top_until > now
+        ).count(),
+        'top_female_profiles': Profile.query.filter(
+            Profile.is_active == True, Profile.gender == 'Ayol', Profile.top_until > now
+        ).count(),
 
         'total_tariffs': UserTariff.query.count(),
         'active_tariffs': UserTariff.query.filter_by(is_active=True).count(),
@@ -205,7 +236,13 @@ def statistics():
         'rejected_requests': MatchRequest.query.filter_by(status='rejected').count(),
 
         'total_chats': Chat.query.count(),
-        'active_chats': Chat.query.filter_by(is_active=True).count()
+        'active_chats': Chat.query.filter_by(is_active=True).count(),
+
+        # Ko'rishlar (guruhlab yoziladi - oxirgi VIEW_COUNTER_FLUSH_INTERVAL soniya kirmaydi)
+        'total_views': db.session.query(func.coalesce(func.sum(Profile.views_count), 0)).scalar(),
+        'views_today': db.session.query(func.coalesce(func.sum(ProfileViewStat.views), 0)).filter(
+            ProfileViewStat.view_date == now.date()
+        ).scalar()
     }
 
     # Hududlar bo'yicha statistika
@@ -214,7 +251,46 @@ def statistics():
         func.count(Profile.id)
     ).group_by(Profile.region).all()
 
-    return render_template('admin/statistics.html',
-                         user=user,
-                         stats=stats,
-                         region_stats=region_stats)
+    return stats, region_stats
+
+
+@admin_bp.route('/api/views')
+@admin_required
+def view_stats():
+    """Eng ko'p ko'rilgan profillar: ?days=7 davrdagi ko'rishlar va noyob ko'ruvchilar (taxminiy)"""
+    days = max(1, min(request.args.get('days', 7, type=int), 90))
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+
+    top_profiles = db.session.query(
+        ProfileViewStat.profile_id, func.sum(ProfileViewStat.views).label('views')
+    ).filter(ProfileViewStat.view_date >= since).group_by(ProfileViewStat.profile_id).order_by(
+        func.sum(ProfileViewStat.views).desc()
+    ).limit(limit).all()
+
+    profile_ids = [profile_id for profile_id, _ in top_profiles]
+    summary = ProfileViewStat.summary(profile_ids, days)
+    profiles = {profile.id: profile for profile in Profile.query.filter(Profile.id.in_(profile_ids))}
+
+    results = []
+    for profile_id in profile_ids:
+        profile = profiles.get(profile_id)
+        views, unique_viewers = summary[profile_id]
+        results.append({
+            'profile_id': profile_id,
+            'user_id': profile.user_id if profile else None,
+            'name': profile.name if profile else None,
+            'is_top': profile.is_top if profile else False,
+            'views': views,
+            'unique_viewers': unique_viewers,
+            'total_views': (profile.views_count or 0) if profile else 0
+        })
+
+    return jsonify({'days': days, 'profiles': results})
+
+
+@admin_bp.route('/api/singleflight')
+@admin_required
+def singleflight_stats():
+    """Single-flight hisoblagichlari (hit/miss/coalesced) - joriy worker bo'yicha"""
+    return jsonify(flights.stats())
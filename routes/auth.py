@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, g, jsonify
 from models import User, Profile
 from database import db
 from datetime import datetime
@@ -48,12 +48,10 @@ def index():
 @auth_bp.route('/api/user-data')
 def get_user_data():
     """Foydalanuvchi ma'lumotlarini olish (SPA uchun)"""
-    user_id = session.get('user_id')
-
-    if not user_id:
+    if 'user_id' not in session:
         return jsonify({'error': 'Avtorizatsiya kerak'}), 401
 
-    user = User.query.get(user_id)
+    user = load_current_user()
 
     if not user:
         return jsonify({'error': 'Foydalanuvchi topilmadi'}), 404
@@ -104,12 +102,7 @@ def get_user_data():
 @auth_bp.route('/api/check-auth')
 def check_auth():
     """Foydalanuvchi autentifikatsiyasini tekshirish"""
-    user_id = session.get('user_id')
-
-    if not user_id:
-        return jsonify({'authenticated': False}), 401
-
-    user = User.query.get(user_id)
+    user = load_current_user()
 
     if not user:
         return jsonify({'authenticated': False}), 401
@@ -124,6 +117,17 @@ def check_auth():
     })
 
 
+def load_current_user():
+    """Joriy foydalanuvchi - so'rov davomida bir marta yuklanadi (profil va aktiv tarif bilan)
+
+    Decoratorlar chaqiradi, view'lar g.current_user dan foydalanadi.
+    """
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        g.current_user = User.load_current(user_id) if user_id else None
+    return g.current_user
+
+
 def login_required(f):
     """Login talab qiluvchi decorator"""
     from functools import wraps
@@ -133,7 +137,7 @@ def login_required(f):
         if 'user_id' not in session:
             return redirect(url_for('auth.index'))
 
-        user = User.query.get(session['user_id'])
+        user = load_current_user()
         if not user:
             return redirect(url_for('auth.index'))
 
@@ -151,7 +155,7 @@ def profile_required(f):
         if 'user_id' not in session:
             return redirect(url_for('auth.index'))
 
-        user = User.query.get(session['user_id'])
+        user = load_current_user()
         if not user or not user.profile_completed:
             # Onboarding endi SPA ichida bajariladi, shuning uchun profil sahifasiga yo'naltiramiz
             return redirect(url_for('profile.view'))
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, session, jsonify
+from flask import Blueprint, render_template, request, g, jsonify
 from models import User, Chat, Message
 from database import db
 from routes.auth import login_required, profile_required
@@ -14,7 +14,7 @@ chat_bp = Blueprint('chat', __name__, url_prefix='/chat')
 @profile_required
 def index():
     """Chatlar ro'yxati - SPA ga yo'naltirish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
     return render_template('spa.html', user=user)
 
 
@@ -22,7 +22,7 @@ def index():
 @profile_required
 def get_chats():
     """Foydalanuvchining barcha chatlarini olish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     chats = current_user.get_chats()
 
@@ -76,7 +76,7 @@ def get_chats():
 @profile_required
 def view_chat(chat_id):
     """Chatni ko'rish - SPA ga yo'naltirish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     chat = Chat.query.get(chat_id)
 
@@ -98,7 +98,7 @@ def view_chat(chat_id):
 @profile_required
 def get_messages(chat_id):
     """Chat xabarlarini olish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     chat = Chat.query.get(chat_id)
 
@@ -144,7 +144,7 @@ def get_messages(chat_id):
 @profile_required
 def send_message(chat_id):
     """Xabar yuborish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
     data = request.get_json()
 
     chat = Chat.query.get(chat_id)
@@ -217,7 +217,7 @@ def send_message(chat_id):
 @profile_required
 def mark_messages_read(chat_id):
     """Xabarlarni o'qilgan deb belgilash"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     chat = Chat.query.get(chat_id)
 
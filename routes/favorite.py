@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, request, session, jsonify
+from flask import Blueprint, render_template, request, g, jsonify
 from models import User, Favorite, Profile
 from database import db
 from routes.auth import login_required, profile_required
+from sqlalchemy.orm import joinedload
 
 favorite_bp = Blueprint('favorite', __name__, url_prefix='/favorites')
 
@@ -10,7 +11,7 @@ favorite_bp = Blueprint('favorite', __name__, url_prefix='/favorites')
 @profile_required
 def index():
     """Sevimlilar sahifasi - SPA ga yo'naltirish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
     return render_template('spa.html', user=user)
 
 
@@ -18,13 +19,21 @@ def index():
 @profile_required
 def get_favorites():
     """Sevimlilar ro'yxatini olish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
-    favorites = Favorite.query.filter_by(
+    # Ixcham ko'rinish: ?view=card yoki ?fields=a,b
+    fields = Profile.fields_from_args(request.args)
+
+    # Sevimli foydalanuvchilar va profillarini bitta so'rovda yuklash
+    profile_loader = joinedload(Favorite.favorite_user).joinedload(User.profile)
+    if fields is not None:
+        profile_loader = profile_loader.load_only(*Profile.columns_for(fields))
+
+    favorites = Favorite.query.options(profile_loader).filter_by(
         user_id=current_user.id
     ).order_by(Favorite.created_at.desc()).all()
 
-    favorites_data = [fav.to_dict() for fav in favorites]
+    favorites_data = [fav.to_dict(fields) for fav in favorites]
 
     return jsonify({
         'favorites': favorites_data,
@@ -36,7 +45,7 @@ def get_favorites():
 @profile_required
 def add_favorite():
     """Sevimliga qo'shish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
     data = request.get_json()
 
     favorite_user_id = data.get('user_id')
@@ -48,32 +57,23 @@ def add_favorite():
     if favorite_user_id == current_user.id:
         return jsonify({'error': 'O\'zingizni sevimliga qo\'sha olmaysiz'}), 400
 
-    # Foydalanuvchi mavjudligini tekshirish
-    favorite_user = User.query.get(favorite_user_id)
-    if not favorite_user or not favorite_user.profile or not favorite_user.profile.is_active:
+    # Qo'shish idempotent: takroriy so'rov xato emas (unique indeks + INSERT ... IGNORE),
+    # profildagi favorited_count shu tranzaksiyada oshadi
+    added = Favorite.add(current_user.id, favorite_user_id)
+    if added is None:
         return jsonify({'error': 'Foydalanuvchi topilmadi'}), 404
-
-    # Allaqachon sevimliga qo'shilganmi?
-    existing_favorite = Favorite.query.filter_by(
-        user_id=current_user.id,
-        favorite_user_id=favorite_user_id
-    ).first()
-
-    if existing_favorite:
-        return jsonify({'error': 'Allaqachon sevimliga qo\'shilgan'}), 400
-
-    # Sevimliga qo'shish
-    new_favorite = Favorite(
-        user_id=current_user.id,
-        favorite_user_id=favorite_user_id
-    )
-    db.session.add(new_favorite)
+    favorite_id, created = added
     db.session.commit()
 
     return jsonify({
         'success': True,
-        'message': 'Sevimliga qo\'shildi',
-        'favorite': new_favorite.to_dict()
+        'created': created,
+        'message': 'Sevimliga qo\'shildi' if created else 'Allaqachon sevimliga qo\'shilgan',
+        'favorite': {
+            'id': favorite_id,
+            'user_id': current_user.id,
+            'favorite_user_id': favorite_user_id
+        }
     })
 
 
@@ -81,7 +81,7 @@ def add_favorite():
 @profile_required
 def remove_favorite(favorite_id):
     """Sevimlidan olib tashlash"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     favorite = Favorite.query.get(favorite_id)
 
@@ -92,7 +92,7 @@ def remove_favorite(favorite_id):
     if favorite.user_id != current_user.id:
         return jsonify({'error': 'Bu sevimlini olib tashla olmaysiz'}), 403
 
-    db.session.delete(favorite)
+    favorite.remove()
     db.session.commit()
 
     return jsonify({
@@ -1,45 +1,111 @@
-from flask import Blueprint, render_template, request, session, jsonify
-from models import User, Profile, Favorite
+from flask import Blueprint, render_template, request, g, jsonify
+from models import User, Profile, Favorite, UserTariff, ListingCounter, UserPair, DailySuggestion
+from models.profile import CARD_FIELDS
 from database import db
+from services import TTLCache, invalidate_on_commit
+from services.listing_index import listing_index
+from services.top_listings import top_listings
+from services.exclusions import feed_exclusions
+from services.search import profile_search
+from services.similar import similar_profiles
+from services.singleflight import flights
+from services.view_counter import view_counter
+from services.matching import rank_by_match, MATCH_CRITERIA
+from config import Config
 from routes.auth import login_required, profile_required
 from sqlalchemy import and_, or_, case
+from sqlalchemy.orm import load_only
 from datetime import datetime
+import base64
+import json
+import numpy as np
 
 feed_bp = Blueprint('feed', __name__, url_prefix='/feed')
 
+# Serializatsiya qilingan feed sahifalari keshi (worker ichida)
+# Profile, UserTariff yoki Favorite o'zgarib commit qilinganda tozalanadi
+feed_page_cache = TTLCache(ttl=Config.FEED_CACHE_TTL)
+invalidate_on_commit(feed_page_cache, Profile, UserTariff, Favorite)
+
+# Cursor sahifasini chiqarib tashlanganlar o'rniga to'ldirishda ko'riladigan umumiy sahifalar chegarasi
+FEED_FILL_MAX_PAGES = 5
+
+
+def _encode_cursor(is_top, activated_at, profile_id, score=None):
+    """Keyset pagination uchun cursor yaratish: (is_top, activated_at, id)
+
+    sort=match rejimida oldiga moslik bali qo'shiladi: (score, is_top, activated_at, id)
+    """
+    payload = [int(is_top), activated_at.isoformat() if activated_at else None, profile_id]
+    if score is not None:
+        payload.insert(0, int(score))
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_cursor(cursor, match=False):
+    """Cursor'ni (is_top, activated_at, id) ga aylantirish, noto'g'ri bo'lsa None
+
+    match=True bo'lsa (score, is_top, activated_at, id) kutiladi - boshqa rejim cursor'i rad etiladi.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if match:
+            score, *payload = payload
+        is_top, activated_at, profile_id = payload
+        activated_at = datetime.fromisoformat(activated_at) if activated_at else None
+        decoded = (int(is_top), activated_at, int(profile_id))
+        return (int(score),) + decoded if match else decoded
+    except (ValueError, TypeError):
+        return None
+
+
+def _after_cursor(is_top_rank, cursor):
+    """Saralash tartibida cursor'dan keyin keladigan e'lonlar sharti"""
+    cursor_is_top, cursor_activated_at, cursor_id = cursor
+
+    # activated_at DESC tartibida NULL qiymatlar oxirida keladi
+    if cursor_activated_at is None:
+        same_rank_after = and_(Profile.activated_at.is_(None), Profile.id < cursor_id)
+    else:
+        same_rank_after = or_(
+            Profile.activated_at < cursor_activated_at,
+            and_(Profile.activated_at == cursor_activated_at, Profile.id < cursor_id),
+            Profile.activated_at.is_(None)
+        )
+
+    return or_(
+        is_top_rank < cursor_is_top,
+        and_(is_top_rank == cursor_is_top, same_rank_after)
+    )
+
 
 @feed_bp.route('/')
 @profile_required
 def index():
     """E'lonlar sahifasi (Feed) - SPA ga yo'naltirish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
     # SPA sahifasiga yo'naltirish
     return render_template('spa.html', user=user)
 
 
-@feed_bp.route('/api/listings')
-@profile_required
-def get_listings():
-    """E'lonlarni olish (API)"""
-    current_user = User.query.get(session['user_id'])
-    current_profile = current_user.profile
-
-    # Pagination
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
+def _profiles_query(fields):
+    """Profile so'rovi - fields berilsa faqat kerakli ustunlar yuklanadi"""
+    query = Profile.query
+    if fields is not None:
+        query = query.options(load_only(*Profile.columns_for(fields)))
+    return query
 
-    # Filterlar
-    show_top_only = request.args.get('top_only', 'false') == 'true'
 
+def _build_feed_page(viewer_gender, page, per_page, cursor_param, cursor, fields=None):
+    """Feed sahifasini hisoblash (ko'ruvchiga bog'liq bo'lmagan qism, keshlanadi)"""
     # Base query
-    query = Profile.query.filter(
-        Profile.is_active == True,
-        Profile.user_id != current_user.id
-    )
+    # Ko'ruvchining o'zi javobdan keyinroq chiqarib tashlanadi, shunda sahifa
+    # bir xil jinsdagi barcha ko'ruvchilar uchun umumiy bo'ladi
+    query = _profiles_query(fields).filter(Profile.is_active == True)
 
     # Jinsi bo'yicha filter (qarshi jins)
     # Avval qarshi jins bo'yicha filter qo'llaymiz
-    if current_profile.gender == 'Erkak':
+    if viewer_gender == 'Erkak':
         opposite_gender = 'Ayol'
     else:
         opposite_gender = 'Erkak'
@@ -49,95 +115,478 @@ def get_listings():
     
     # Agar qarshi jins bo'yicha e'lonlar topilmasa, jins filterini qoldiramiz
     # (bu test uchun, keyinroq o'chirilishi mumkin)
-    # Avval tekshiramiz, qarshi jins bo'yicha e'lonlar bormi?
-    # exists() ishlatamiz, bu count() dan tezroq
-    has_opposite_gender = db.session.query(query_with_gender.exists()).scalar()
+    # Tekshiruv listing_counters hisoblagichidan olinadi (jadval bo'ylab so'rov yo'q)
+    has_opposite_gender = ListingCounter.active_count_for(opposite_gender) > 0
     
     if has_opposite_gender:
         # Qarshi jins bo'yicha e'lonlar bor, filter qo'llaymiz
         query = query_with_gender
     # Agar qarshi jins bo'yicha e'lonlar yo'q bo'lsa, jins filterini qoldiramiz
-    # (query o'zgarishsiz qoladi - faqat is_active va user_id filterlari qoladi)
+    # (query o'zgarishsiz qoladi - faqat is_active filteri qoladi)
 
     # Juftga talablar filterlari olib tashlandi
     # Bu filterlar ilovani ochgandan keyin filter funksiyasi orqali ishlatilishi mumkin
 
-    # User bilan join qilish (zarur, chunki UserTariff bilan join qilish uchun)
-    query = query.join(User)
-    
-    # TOP e'lonlar
-    from models.tariff import UserTariff
-    
-    if show_top_only:
-        # Faqat TOP tarifga ega foydalanuvchilarni ko'rsatish
-        query = query.join(UserTariff, db.and_(
-            UserTariff.user_id == User.id,
-            UserTariff.is_active == True,
-            UserTariff.is_top == True,
-            db.or_(
-                UserTariff.top_expires_at.is_(None),
-                UserTariff.top_expires_at > datetime.utcnow()
-            )
-        ))
-    else:
-        # TOP e'lonlarni birinchi o'ringa qo'yish uchun outerjoin
-        query = query.outerjoin(
-            UserTariff, 
-            db.and_(
-                UserTariff.user_id == User.id,
-                UserTariff.is_active == True,
-                UserTariff.is_top == True,
-                db.or_(
-                    UserTariff.top_expires_at.is_(None),
-                    UserTariff.top_expires_at > datetime.utcnow()
-                )
-            )
-        )
+    # TOP e'lonlar - Profile.top_until ustunidan (UserTariff bilan join shart emas)
+    now = datetime.utcnow()
+    is_top_rank = case((Profile.top_until > now, 1), else_=0)
 
     # Saralash: avval TOP, keyin yangilari
     # Faqat is_active == True bo'lgan e'lonlar ko'rsatilishi kerak (allaqachon filter qilingan)
-    # UserTariff.is_top NULL bo'lishi mumkin, shuning uchun CASE ishlatamiz
     query = query.order_by(
-        db.desc(case((UserTariff.is_top == True, 1), else_=0)),
-        db.desc(Profile.activated_at)
+        db.desc(is_top_rank),
+        db.desc(Profile.activated_at),
+        db.desc(Profile.id)
     )
 
-    # Pagination
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    profiles = pagination.items
+    if cursor_param is not None:
+        # Keyset pagination: OFFSET va COUNT(*) yo'q, bitta ortiqcha qator has_next uchun
+        if cursor:
+            query = query.filter(_after_cursor(is_top_rank, cursor))
+        profiles = query.limit(per_page + 1).all()
+        has_next = len(profiles) > per_page
+        profiles = profiles[:per_page]
+        pagination = None
+    else:
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        profiles = pagination.items
     
     # Debug: Query natijalarini tekshirish
     import logging
     logger = logging.getLogger(__name__)
     logger.info(f"Feed query results: {len(profiles)} profiles found")
-    logger.info(f"Query filters: is_active=True, user_id!={current_user.id}, current_gender={current_profile.gender}")
-    logger.info(f"Total active profiles in DB: {Profile.query.filter(Profile.is_active == True).count()}")
-
-    # Current user'ning favorites list'ini olish
-    user_favorites = Favorite.query.filter_by(user_id=current_user.id).all()
-    favorite_user_ids = {fav.favorite_user_id for fav in user_favorites}
+    logger.info(f"Query filters: is_active=True, viewer_gender={viewer_gender}")
 
     # JSON formatga o'tkazish
+    # TOP statusi profilning o'z ustunidan olinadi - har bir karta uchun tarif so'rovi yo'q
     listings = []
     for profile in profiles:
-        # TOP statusini tekshirish
-        is_top = False
-        if profile.user.has_active_tariff:
-            active_tariff = profile.user.active_tariff
-            if active_tariff and active_tariff.is_top and not active_tariff.is_top_expired:
-                is_top = True
-
-        listing = profile.to_dict()
-        listing['is_top'] = is_top
+        listing = profile.to_dict(fields)
+        listing['is_top'] = profile.is_top
         listing['user_id'] = profile.user_id
-        listing['is_favorite'] = profile.user_id in favorite_user_ids
 
         listings.append(listing)
 
+    # Qaysi jins ko'rsatilgani - ko'ruvchiga xos qism chiqarib tashlanganlarni sanashi uchun
+    listing_gender = opposite_gender if has_opposite_gender else None
+
+    if pagination is None:
+        next_cursor = None
+        if has_next and profiles:
+            last = profiles[-1]
+            next_cursor = _encode_cursor(last.is_top, last.activated_at, last.id)
+
+        return {
+            'listings': listings,
+            # Har bir karta uchun cursor - sahifa chiqarib tashlanganlar o'rniga to'ldirilganda kerak
+            'cursors': [_encode_cursor(profile.is_top, profile.activated_at, profile.id) for profile in profiles],
+            'listing_gender': listing_gender,
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': has_next
+        }
+
+    return {
+        'listings': listings,
+        'listing_gender': listing_gender,
+        'page': page,
+        'per_page': per_page,
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'has_next': pagination.has_next,
+        'has_prev': pagination.has_prev
+    }
+
+
+def _top_page(viewer_gender, excluded_ids, page, per_page, cursor_param, cursor, fields=None):
+    """?top_only=true sahifasi - jins bo'yicha oldindan hisoblangan TOP ro'yxatidan"""
+    opposite_gender = 'Ayol' if viewer_gender == 'Erkak' else 'Erkak'
+    # _build_feed_page dagi kabi: qarshi jins e'lonlari bo'lmasa barcha jinslar
+    listing_gender = opposite_gender if ListingCounter.active_count_for(opposite_gender) > 0 else None
+    entries = top_listings.entries(listing_gender)
+
+    # Ko'ruvchi bog'langan va bloklangan foydalanuvchilar sahifalashdan oldin chiqariladi
+    if entries and len(excluded_ids):
+        user_ids = np.array([listing['user_id'] for _, _, listing in entries], dtype=np.int64)
+        kept = np.flatnonzero(~np.isin(user_ids, excluded_ids))
+        entries = [entries[position] for position in kept]
+
+    def project(listing):
+        if fields is None:
+            return listing
+        return dict({field: listing[field] for field in fields}, is_top=True, user_id=listing['user_id'])
+
+    if cursor_param is not None:
+        if cursor:
+            cursor_is_top, cursor_activated_at, cursor_id = cursor
+            if not cursor_is_top:
+                # Cursor TOP bo'lmagan e'londan keyin - TOP ro'yxati tugagan
+                entries = []
+            else:
+                # activated_at DESC tartibida NULL qiymatlar oxirida keladi
+                cursor_key = (cursor_activated_at or datetime.min, cursor_id)
+                entries = [entry for entry in entries if (entry[0] or datetime.min, entry[1]) < cursor_key]
+        page_entries = entries[:per_page]
+        has_next = len(entries) > per_page
+        next_cursor = None
+        if has_next and page_entries:
+            activated_at, profile_id, _ = page_entries[-1]
+            next_cursor = _encode_cursor(True, activated_at, profile_id)
+        return {
+            'listings': [project(listing) for _, _, listing in page_entries],
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': has_next
+        }
+
+    total = len(entries)
+    pages = (total + per_page - 1) // per_page
+    page_entries = entries[(page - 1) * per_page:page * per_page]
+    return {
+        'listings': [project(listing) for _, _, listing in page_entries],
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': pages,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
+
+def _exclude_listings(listings, excluded_ids):
+    """Ko'ruvchi bog'langan yoki bloklangan foydalanuvchilar kartalarini olib tashlash"""
+    if not listings or not len(excluded_ids):
+        return listings
+    user_ids = np.array([listing['user_id'] for listing in listings], dtype=np.int64)
+    excluded = np.isin(user_ids, excluded_ids)
+    return [listing for listing, is_excluded in zip(listings, excluded) if not is_excluded]
+
+
+def _shared_feed_page(viewer_gender, page, per_page, cursor_param, fields=None):
+    """Umumiy (keshdagi) feed sahifasi - bir xil sahifani parallel so'ragan oqimlar bitta hisoblashni kutadi"""
+    # Sahifa keshi: (ko'ruvchi jinsi, cursor/page, kalitlar) bo'yicha umumiy
+    if cursor_param is not None:
+        cache_key = (viewer_gender, 'cursor', cursor_param, fields)
+        cursor = _decode_cursor(cursor_param) if cursor_param else None
+    else:
+        cache_key = (viewer_gender, 'page', page, fields)
+        cursor = None
+
+    return flights.do('feed_page', cache_key, lambda: _build_feed_page(
+        viewer_gender, page, per_page, cursor_param, cursor, fields
+    ), cache=feed_page_cache)
+
+
+def _viewer_cursor_page(viewer_gender, excluded_ids, per_page, cursor_param, fields=None):
+    """Cursor sahifasi chiqarib tashlanganlarsiz: kamaygan joylar keyingi umumiy sahifalardan to'ldiriladi
+
+    Umumiy sahifalar keshdan olinadi; ko'pi bilan FEED_FILL_MAX_PAGES ta sahifa ko'riladi,
+    undan keyin sahifa qisqa qaytadi, lekin next_cursor davom etishga imkon beradi.
+    """
+    listings = []
+    cursors = []
+    next_cursor = cursor_param
+    has_next = True
+    for _ in range(FEED_FILL_MAX_PAGES):
+        if not has_next or len(listings) >= per_page:
+            break
+        page_data = _shared_feed_page(viewer_gender, 1, per_page, next_cursor, fields)
+        excluded = np.isin([listing['user_id'] for listing in page_data['listings']], excluded_ids)
+        for listing, listing_cursor, is_excluded in zip(page_data['listings'], page_data['cursors'], excluded):
+            if not is_excluded:
+                listings.append(listing)
+                cursors.append(listing_cursor)
+        next_cursor = page_data['next_cursor']
+        has_next = page_data['has_next']
+
+    if len(listings) > per_page:
+        # Oxirgi umumiy sahifa o'rtasida to'xtaldik - davomi shu kartadan keyin
+        listings = listings[:per_page]
+        next_cursor = cursors[per_page - 1]
+        has_next = True
+
+    return {
+        'listings': listings,
+        'per_page': per_page,
+        'next_cursor': next_cursor if has_next else None,
+        'has_next': has_next
+    }
+
+
+def _excluded_in_feed(listing_gender, current_user, excluded_ids):
+    """Umumiy feed'dagi (faol, ko'rsatilgan jins) chiqarib tashlanadigan foydalanuvchilar soni"""
+    # Ko'ruvchining o'zi faqat barcha jinslar ko'rsatilganda feed'da bo'ladi
+    count = int(listing_gender is None and bool(current_user.profile.is_active))
+    contacted_ids = excluded_ids[excluded_ids != current_user.id]
+    if len(contacted_ids):
+        query = db.session.query(db.func.count(Profile.id)).filter(
+            Profile.is_active == True,
+            Profile.user_id.in_(contacted_ids.tolist())
+        )
+        if listing_gender is not None:
+            query = query.filter(Profile.gender == listing_gender)
+        count += query.scalar()
+    return count
+
+
+def _viewer_overlay(current_user, listings):
+    """Ko'ruvchiga xos qism: is_favorite va so'rov/chat holati
+
+    Kartalar (keshdagi ham) o'zgartirilmaydi - har biri uchun yangi dict qaytariladi.
+    """
+    # Current user'ning favorites list'ini olish (faqat ID lar)
+    favorite_user_ids = {
+        favorite_user_id for (favorite_user_id,) in db.session.query(Favorite.favorite_user_id).filter(
+            Favorite.user_id == current_user.id
+        )
+    }
+
+    # Sahifadagi barcha kartalar uchun so'rov/chat holati - bitta IN so'rovi
+    pairs_by_user = UserPair.for_user(current_user.id, [listing['user_id'] for listing in listings])
+
+    overlaid = []
+    for listing in listings:
+        pair = pairs_by_user.get(listing['user_id'])
+        overlaid.append(dict(
+            listing,
+            is_favorite=listing['user_id'] in favorite_user_ids,
+            request_status=pair.status if pair else None,
+            chat_id=pair.chat_id if pair and pair.status == 'accepted' else None
+        ))
+    return overlaid
+
+
+# Indeks orqali ishlaydigan filterlar
+FILTER_INT_PARAMS = ('age_min', 'age_max', 'height_min', 'height_max')
+FILTER_CATEGORY_PARAMS = ('region', 'religious_level', 'marital_status', 'education')
+
+
+def _parse_filters(args):
+    """So'rov parametrlaridan filterlarni olish (kategoriyalar vergul bilan bir nechta bo'lishi mumkin)"""
+    filters = {}
+    for name in FILTER_INT_PARAMS:
+        value = args.get(name, type=int)
+        if value is not None:
+            filters[name] = value
+    for name in FILTER_CATEGORY_PARAMS:
+        values = [value.strip() for value in args.get(name, '').split(',') if value.strip()]
+        if values:
+            filters[name] = values
+    is_working = args.get('is_working')
+    if is_working in ('true', 'false'):
+        filters['is_working'] = is_working == 'true'
+    return filters
+
+
+def _after_cursor_mask(pool, cursor, now):
+    """_after_cursor() ning snapshot massivlari ustidagi varianti"""
+    cursor_is_top, cursor_activated_at, cursor_id = cursor
+    cursor_timestamp = cursor_activated_at.timestamp() if cursor_activated_at else -np.inf
+    is_top = pool.is_top(now).astype(np.int8)
+
+    same_rank_after = (pool.activated_at < cursor_timestamp) | (
+        (pool.activated_at == cursor_timestamp) & (pool.profile_ids < cursor_id)
+    )
+    return (is_top < cursor_is_top) | ((is_top == cursor_is_top) & same_rank_after)
+
+
+def _indexed_listings(current_user, current_profile, page, per_page, cursor_param, cursor,
+                      show_top_only, filters, sort_by_match, fields=None):
+    """Filterlangan yoki moslik bo'yicha saralangan feed - worker ichidagi ustunli indeks orqali"""
+    snapshot = listing_index.snapshot()
+    now = datetime.utcnow()
+
+    opposite_gender = 'Ayol' if current_profile.gender == 'Erkak' else 'Erkak'
+    mask = snapshot.filter_mask(filters, now)
+    # _build_feed_page dagi kabi: qarshi jins e'lonlari bo'lmasa barcha jinslar
+    if ListingCounter.active_count_for(opposite_gender) > 0:
+        mask &= snapshot.genders == snapshot.code(opposite_gender)
+    mask &= snapshot.user_ids != current_user.id
+    # So'rov/chat bo'lgan va bloklangan foydalanuvchilar
+    mask &= ~np.isin(snapshot.user_ids, feed_exclusions.for_user(current_user.id))
+    if show_top_only:
+        mask &= snapshot.is_top(now)
+    pool = snapshot.take(np.flatnonzero(mask))
+
+    scores = None
+    if sort_by_match:
+        order, scores = rank_by_match(current_profile, pool, now)
+        if cursor:
+            # Cursor'dan keyin: bali kichikroq yoki bali teng va feed tartibida keyinroq
+            cursor_score, *feed_cursor = cursor
+            after = (scores < cursor_score) | (
+                (scores == cursor_score) & _after_cursor_mask(pool, feed_cursor, now)
+            )
+            order = order[after[order]]
+    else:
+        order = pool.feed_order(np.arange(len(pool)), now)
+        if cursor:
+            order = order[_after_cursor_mask(pool, cursor, now)[order]]
+
+    if cursor_param is not None:
+        page_positions = order[:per_page + 1]
+        has_next = len(page_positions) > per_page
+        page_positions = page_positions[:per_page]
+    else:
+        page_positions = order[(page - 1) * per_page:page * per_page]
+
+    # Sahifadagi profillarni bitta IN so'rovi bilan yuklab, tartibni saqlash
+    page_profile_ids = [int(profile_id) for profile_id in pool.profile_ids[page_positions]]
+    profiles_by_id = {
+        profile.id: profile for profile in _profiles_query(fields).filter(Profile.id.in_(page_profile_ids)).all()
+    } if page_profile_ids else {}
+
+    listings = []
+    for position, profile_id in zip(page_positions, page_profile_ids):
+        profile = profiles_by_id.get(profile_id)
+        if not profile or not profile.is_active:
+            continue
+        listing = profile.to_dict(fields)
+        listing['is_top'] = profile.is_top
+        listing['user_id'] = profile.user_id
+        if scores is not None:
+            listing['match_score'] = int(scores[position]) * 100 // MATCH_CRITERIA
+        listings.append(listing)
+    listings = _viewer_overlay(current_user, listings)
+
+    if cursor_param is not None:
+        next_cursor = None
+        if has_next and page_profile_ids:
+            last = profiles_by_id.get(page_profile_ids[-1])
+            if last:
+                score = scores[page_positions[-1]] if scores is not None else None
+                next_cursor = _encode_cursor(last.is_top, last.activated_at, last.id, score)
+        return jsonify({
+            'listings': listings,
+            'per_page': per_page,
+            'next_cursor': next_cursor,
+            'has_next': has_next
+        })
+
+    total = len(order)
+    pages = (total + per_page - 1) // per_page
     return jsonify({
         'listings': listings,
         'page': page,
         'per_page': per_page,
+        'total': total,
+        'pages': pages,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    })
+
+
+@feed_bp.route('/api/listings')
+@profile_required
+def get_listings():
+    """E'lonlarni olish (API)"""
+    current_user = g.current_user
+    current_profile = current_user.profile
+
+    # Pagination: ?cursor= (keyset, COUNT siz) yoki eski ?page= rejimi
+    page = request.args.get('page', 1, type=int)
+    per_page = 20
+    cursor_param = request.args.get('cursor')
+    sort_by_match = request.args.get('sort') == 'match'
+    cursor = None
+    if cursor_param:
+        cursor = _decode_cursor(cursor_param, match=sort_by_match)
+        if cursor is None:
+            return jsonify({'error': 'Noto\'g\'ri cursor'}), 400
+
+    # Filterlar
+    show_top_only = request.args.get('top_only', 'false') == 'true'
+
+    filters = _parse_filters(request.args)
+
+    # Ixcham ko'rinish: ?view=card yoki ?fields=a,b
+    fields = Profile.fields_from_args(request.args)
+
+    # Filterlar va moslik bo'yicha saralash indeks orqali (ko'ruvchiga xos, sahifa keshiga tushmaydi)
+    if filters or sort_by_match:
+        return _indexed_listings(current_user, current_profile, page, per_page, cursor_param, cursor,
+                                 show_top_only, filters, sort_by_match, fields)
+
+    # Ko'ruvchining o'zi, u bog'langan va bloklangan foydalanuvchilar
+    excluded_ids = np.union1d(feed_exclusions.for_user(current_user.id), [current_user.id])
+
+    # TOP karuseli - jins bo'yicha umumiy ro'yxatdan, faqat ko'ruvchi qismi qo'shiladi
+    if show_top_only:
+        page_data = _top_page(current_profile.gender, excluded_ids, page, per_page, cursor_param, cursor, fields)
+        listings = _viewer_overlay(current_user, page_data['listings'])
+        return jsonify(dict(page_data, listings=listings))
+
+    if cursor_param is not None:
+        page_data = _viewer_cursor_page(current_profile.gender, excluded_ids, per_page, cursor_param, fields)
+        listings = _viewer_overlay(current_user, page_data['listings'])
+        return jsonify(dict(page_data, listings=listings))
+
+    # Eski ?page= rejimi: umumiy sahifadan chiqarib tashlanadi, shuning uchun sahifa qisqa
+    # bo'lishi mumkin; total/pages esa chiqarib tashlanganlarsiz hisoblanadi
+    page_data = _shared_feed_page(current_profile.gender, page, per_page, None, fields)
+    total = page_data['total'] - _excluded_in_feed(page_data['listing_gender'], current_user, excluded_ids)
+    pages = (total + per_page - 1) // per_page
+
+    return jsonify({
+        'listings': _viewer_overlay(current_user, _exclude_listings(page_data['listings'], excluded_ids)),
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': pages,
+        'has_next': page < pages,
+        'has_prev': page_data['has_prev']
+    })
+
+
+@feed_bp.route('/api/search')
+@profile_required
+def search_listings():
+    """bio va profession bo'yicha qidiruv (feed cheklovlari bilan: faol, qarshi jins)"""
+    current_user = g.current_user
+    current_profile = current_user.profile
+
+    tokens = profile_search.parse_query(request.args.get('q', ''))
+    if not tokens or max(len(token) for token in tokens) < 2:
+        return jsonify({'error': 'Qidiruv so\'zi kamida 2 ta harfdan iborat bo\'lishi kerak'}), 400
+
+    page = request.args.get('page', 1, type=int)
+    per_page = 20
+    fields = Profile.fields_from_args(request.args)
+
+    now = datetime.utcnow()
+    opposite_gender = 'Ayol' if current_profile.gender == 'Erkak' else 'Erkak'
+    query = _profiles_query(fields).filter(
+        Profile.is_active == True,
+        Profile.user_id != current_user.id,
+        profile_search.condition(tokens)
+    )
+    # _build_feed_page dagi kabi: qarshi jins e'lonlari bo'lmasa jins filteri qo'llanmaydi
+    if ListingCounter.active_count_for(opposite_gender) > 0:
+        query = query.filter(Profile.gender == opposite_gender)
+
+    excluded_ids = feed_exclusions.for_user(current_user.id)
+    if len(excluded_ids):
+        query = query.filter(Profile.user_id.notin_(excluded_ids.tolist()))
+
+    is_top_rank = case((Profile.top_until > now, 1), else_=0)
+    pagination = query.order_by(
+        db.desc(is_top_rank),
+        db.desc(Profile.activated_at),
+        db.desc(Profile.id)
+    ).paginate(page=page, per_page=per_page, error_out=False)
+
+    listings = []
+    for profile in pagination.items:
+        listing = profile.to_dict(fields)
+        listing['is_top'] = profile.is_top
+        listing['user_id'] = profile.user_id
+        listings.append(listing)
+
+    return jsonify({
+        'listings': _viewer_overlay(current_user, listings),
+        'query': ' '.join(tokens),
+        'page': page,
+        'per_page': per_page,
         'total': pagination.total,
         'pages': pagination.pages,
         'has_next': pagination.has_next,
@@ -145,11 +594,65 @@ def get_listings():
     })
 
 
+@feed_bp.route('/api/suggestions')
+@profile_required
+def get_suggestions():
+    """Tungi hisoblangan kunlik tavsiyalar (daily_suggestions jadvalidan)"""
+    current_user = g.current_user
+    fields = Profile.fields_from_args(request.args)
+
+    suggestions = DailySuggestion.latest_for(current_user.id)
+    excluded_ids = feed_exclusions.for_user(current_user.id)
+    suggested_user_ids = [suggestion.suggested_user_id for suggestion in suggestions]
+    profiles_by_user = {
+        profile.user_id: profile
+        for profile in _profiles_query(fields).filter(Profile.user_id.in_(suggested_user_ids)).all()
+    } if suggested_user_ids else {}
+
+    listings = []
+    for suggestion in suggestions:
+        profile = profiles_by_user.get(suggestion.suggested_user_id)
+        if not profile or not profile.is_active:
+            continue
+        listing = profile.to_dict(fields)
+        listing['is_top'] = profile.is_top
+        listing['user_id'] = profile.user_id
+        listing['match_score'] = suggestion.score * 100 // MATCH_CRITERIA
+        listings.append(listing)
+
+    # Hisoblangandan keyin so'rov yuborilgan yoki bloklanganlar ko'rsatilmaydi
+    listings = _viewer_overlay(current_user, _exclude_listings(listings, excluded_ids))
+
+    return jsonify({
+        'listings': listings,
+        'batch_date': suggestions[0].batch_date.isoformat() if suggestions else None
+    })
+
+
+def _listing_detail(profile, pair, current_user_id):
+    """Bitta e'lonning batafsil ma'lumoti (so'rov/chat holati bilan)"""
+    profile_data = profile.to_dict()
+
+    # TOP statusini qo'shish
+    profile_data['is_top'] = profile.is_top
+    profile_data['user_id'] = profile.user_id
+
+    profile_data['request_sent'] = pair is not None
+    if pair:
+        profile_data['request_status'] = pair.status
+        profile_data['is_sender'] = pair.sender_id == current_user_id
+        # Agar so'rov qabul qilingan bo'lsa, chat_id ni qo'shamiz
+        if pair.status == 'accepted' and pair.chat_id:
+            profile_data['chat_id'] = pair.chat_id
+
+    return profile_data
+
+
 @feed_bp.route('/api/listing/<int:user_id>')
 @profile_required
 def get_listing_detail(user_id):
     """Bitta e'lonni batafsil ko'rish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     # O'zini ko'ra olmasligi
     if user_id == current_user.id:
@@ -160,45 +663,103 @@ def get_listing_detail(user_id):
     if not user or not user.profile or not user.profile.is_active:
         return jsonify({'error': 'Profil topilmadi'}), 404
 
-    profile = user.profile
-    profile_data = profile.to_dict()
+    # Ko'rish xotirada hisoblanadi, bazaga fonda guruhlab yoziladi
+    view_counter.record(user.profile.id, current_user.id)
 
-    # TOP statusini qo'shish
-    is_top = False
-    if user.has_active_tariff:
-        active_tariff = user.active_tariff
-        if active_tariff and active_tariff.is_top and not active_tariff.is_top_expired:
-            is_top = True
+    # Allaqachon so'rov yuborilganmi? (ikki tomonlama - user_pairs jadvalidan)
+    pair = UserPair.between(current_user.id, user.id)
 
-    profile_data['is_top'] = is_top
-    profile_data['user_id'] = user.id
+    return jsonify(_listing_detail(user.profile, pair, current_user.id))
 
-    # Allaqachon so'rov yuborilganmi?
-    from models import MatchRequest
-    # Ikki tomonlama so'rovni tekshirish
-    existing_request = MatchRequest.query.filter(
-        db.or_(
-            db.and_(MatchRequest.sender_id == current_user.id, MatchRequest.receiver_id == user.id),
-            db.and_(MatchRequest.sender_id == user.id, MatchRequest.receiver_id == current_user.id)
-        )
-    ).first()
 
-    profile_data['request_sent'] = existing_request is not None
-    if existing_request:
-        profile_data['request_status'] = existing_request.status
-        profile_data['is_sender'] = existing_request.sender_id == current_user.id
-        # Agar so'rov qabul qilingan bo'lsa, chat_id ni qo'shamiz
-        if existing_request.status == 'accepted' and existing_request.chat:
-            profile_data['chat_id'] = existing_request.chat.id
+def _similar_profiles(current_user, user_id, fields=None):
+    """Profil sahifasi uchun o'xshash profillar (ko'ruvchi o'zi, bog'langan va bloklanganlarsiz)"""
+    excluded_ids = feed_exclusions.for_user(current_user.id)
+    similar_user_ids = [
+        similar_user_id for similar_user_id in similar_profiles.for_user(user_id)
+        if similar_user_id != current_user.id
+    ]
+    if len(excluded_ids):
+        similar_user_ids = [
+            similar_user_id for similar_user_id, is_excluded
+            in zip(similar_user_ids, np.isin(similar_user_ids, excluded_ids)) if not is_excluded
+        ]
+    similar_user_ids = similar_user_ids[:Config.SIMILAR_PROFILES_LIMIT]
+    if not similar_user_ids:
+        return []
+
+    profiles_by_user = {
+        profile.user_id: profile
+        for profile in _profiles_query(fields).filter(Profile.user_id.in_(similar_user_ids)).all()
+    }
+    return [
+        profiles_by_user[similar_user_id] for similar_user_id in similar_user_ids
+        if similar_user_id in profiles_by_user and profiles_by_user[similar_user_id].is_active
+    ]
+
+
+@feed_bp.route('/api/listing/<int:user_id>/similar')
+@profile_required
+def get_similar_listings(user_id):
+    """O'xshash profillar (k-NN indeks orqali, default - ixcham karta ko'rinishi)"""
+    current_user = g.current_user
+    fields = Profile.fields_from_args(request.args) or CARD_FIELDS
+
+    listings = []
+    for profile in _similar_profiles(current_user, user_id, fields):
+        listing = profile.to_dict(fields)
+        listing['is_top'] = profile.is_top
+        listing['user_id'] = profile.user_id
+        listings.append(listing)
 
-    return jsonify(profile_data)
+    return jsonify({'listings': _viewer_overlay(current_user, listings)})
+
+
+@feed_bp.route('/api/listings/batch')
+@profile_required
+def get_listing_details_batch():
+    """Bir nechta e'lonni batafsil olish (?ids=1,2,3) - kartalarni oldindan yuklash uchun
+
+    So'rovlar soni e'lonlar soniga bog'liq emas: profillar va juftliklar bittadan IN so'rovi bilan olinadi.
+    """
+    current_user = g.current_user
+
+    try:
+        user_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids noto\'g\'ri'}), 400
+
+    # Takrorlar va o'zini olib tashlash, tartibni saqlash
+    user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id != current_user.id]
+    if len(user_ids) > Config.FEED_BATCH_MAX_IDS:
+        return jsonify({'error': f'Ko\'pi bilan {Config.FEED_BATCH_MAX_IDS} ta e\'lon'}), 400
+    if not user_ids:
+        return jsonify({'listings': []})
+
+    profiles_by_user = {
+        profile.user_id: profile for profile in Profile.query.filter(
+            Profile.user_id.in_(user_ids),
+            Profile.is_active == True
+        ).all()
+    }
+
+    # Ikki tomonlama so'rov/chat holati - bitta IN so'rovi
+    pairs_by_user = UserPair.for_user(current_user.id, profiles_by_user)
+
+    listings = [
+        _listing_detail(profiles_by_user[user_id], pairs_by_user.get(user_id), current_user.id)
+        for user_id in user_ids
+        if user_id in profiles_by_user
+    ]
+
+    return jsonify({'listings': listings})
 
 
 @feed_bp.route('/profile/<int:user_id>')
 @profile_required
 def profile_detail(user_id):
     """Profil batafsil ko'rish sahifasi"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
     
     # O'zini ko'ra olmasligi
     if user_id == current_user.id:
@@ -208,17 +769,19 @@ def profile_detail(user_id):
     
     if not user or not user.profile or not user.profile.is_active:
         return render_template('error.html', message="Profil topilmadi"), 404
+
+    view_counter.record(user.profile.id, current_user.id)
     
     # Allaqachon so'rov yuborilganmi?
-    from models import MatchRequest
-    existing_request = MatchRequest.query.filter_by(
-        sender_id=current_user.id,
-        receiver_id=user.id
-    ).first()
+    pair = UserPair.between(current_user.id, user.id)
     
-    request_sent = existing_request is not None
+    request_sent = pair is not None and pair.sender_id == current_user.id
+
+    # O'xshash profillar lentasi
+    similar = _similar_profiles(current_user, user.id, CARD_FIELDS)
     
     return render_template('feed/profile_detail.html', 
                          profile=user.profile, 
                          current_user=current_user,
-                         request_sent=request_sent)
+                         request_sent=request_sent,
+                         similar_profiles=similar)
@@ -0,0 +1,39 @@
+from flask import Blueprint, jsonify, send_file
+from routes.auth import login_required
+from services.photos import PHOTO_SIZES, HASH_PATTERN, variant_path, original_path, original_mimetype, photo_store
+import os
+
+media_bp = Blueprint('media', __name__, url_prefix='/media')
+
+# Hash bo'yicha manzil hech qachon boshqa rasmga ishora qilmaydi
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _private(response):
+    # Rasmlar faqat kirgan foydalanuvchilarga - umumiy (CDN/proksi) keshlarda saqlanmaydi
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
+@media_bp.route('/photos/<content_hash>/<size>.jpg')
+@login_required
+def photo(content_hash, size):
+    """Profil rasmi o'lchami (ETag/If-None-Match, If-Modified-Since va Range qo'llab-quvvatlanadi)"""
+    if not HASH_PATTERN.match(content_hash) or size not in PHOTO_SIZES:
+        return jsonify({'error': 'Rasm topilmadi'}), 404
+
+    path = variant_path(content_hash, size)
+    if os.path.exists(path):
+        response = send_file(path, mimetype='image/jpeg', conditional=True, etag=content_hash + size,
+                             max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+        return _private(response)
+
+    # O'lchamlar hali yaratilmoqda (yoki avvalgi urinish xato bergan) - asl rasm qisqa muddatga beriladi
+    if os.path.exists(original_path(content_hash)):
+        photo_store.render(content_hash)
+        return _private(send_file(original_path(content_hash), mimetype=original_mimetype(content_hash),
+                                  conditional=True, max_age=10))
+
+    return jsonify({'error': 'Rasm topilmadi'}), 404
@@ -1,17 +1,39 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
-from models import User, Profile
+from flask import Blueprint, render_template, request, redirect, url_for, g, jsonify
+from models import Profile
 from database import db
 from routes.auth import login_required
+from models.lookup import CodedString
+from services.photos import photo_store, PhotoTooLarge, InvalidPhoto
 from datetime import datetime
 
 profile_bp = Blueprint('profile', __name__, url_prefix='/profile')
 
+# Onboarding qadamlari va ularning maydonlari (/api/onboarding javobidagi completed_steps uchun)
+ONBOARDING_STEPS = {
+    'step1': ('name', 'gender', 'birth_year', 'region', 'nationality', 'marital_status'),
+    'step2': ('height', 'weight'),
+    'step3': ('prays', 'fasts', 'religious_level'),
+    'step4': ('education', 'profession', 'is_working'),
+    'step5': ('partner_age_min', 'partner_age_max', 'partner_region', 'partner_religious_level',
+              'partner_marital_status'),
+    'complete': ('bio',),
+}
+
+# Butun sonli maydonlar uchun ruxsat etilgan oraliq (yil maydoni yoshdan hisoblanadi)
+INT_FIELD_RANGES = {
+    'height': (120, 230),
+    'weight': (30, 250),
+    'partner_age_min': (18, 80),
+    'partner_age_max': (18, 80),
+}
+TEXT_FIELD_LIMITS = {'name': 100, 'profession': 100, 'bio': 2000}
+
 
 @profile_bp.route('/onboarding')
 @login_required
 def onboarding():
     """Onboarding endi SPA ichida bajariladi - eski yo'lni SPA ga yo'naltiramiz"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
     return render_template('spa.html', user=user)
 
 
@@ -19,19 +41,10 @@ def onboarding():
 @login_required
 def onboarding_step1():
     """Qadam 1: Shaxsiy ma'lumotlar"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if request.method == 'POST':
-        profile = user.profile
-        profile.name = request.form.get('name')
-        profile.gender = request.form.get('gender')
-        profile.birth_year = int(request.form.get('birth_year'))
-        profile.region = request.form.get('region')
-        profile.nationality = request.form.get('nationality')
-        profile.marital_status = request.form.get('marital_status')
-
-        db.session.commit()
-        return redirect(url_for('profile.view'))
+        return _save_onboarding_step(user.profile, 'step1')
 
     # Endi onboarding alohida sahifa emas, SPA ichida bajariladi
     return render_template('spa.html', user=user)
@@ -41,15 +54,10 @@ def onboarding_step1():
 @login_required
 def onboarding_step2():
     """Qadam 2: Jismoniy ma'lumotlar"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if request.method == 'POST':
-        profile = user.profile
-        profile.height = int(request.form.get('height'))
-        profile.weight = int(request.form.get('weight'))
-
-        db.session.commit()
-        return redirect(url_for('profile.view'))
+        return _save_onboarding_step(user.profile, 'step2')
 
     return render_template('spa.html', user=user)
 
@@ -58,16 +66,10 @@ def onboarding_step2():
 @login_required
 def onboarding_step3():
     """Qadam 3: Diniy ma'lumotlar"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if request.method == 'POST':
-        profile = user.profile
-        profile.prays = request.form.get('prays')
-        profile.fasts = request.form.get('fasts')
-        profile.religious_level = request.form.get('religious_level')
-
-        db.session.commit()
-        return redirect(url_for('profile.view'))
+        return _save_onboarding_step(user.profile, 'step3')
 
     return render_template('spa.html', user=user)
 
@@ -76,16 +78,10 @@ def onboarding_step3():
 @login_required
 def onboarding_step4():
     """Qadam 4: Ta'lim va kasb"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if request.method == 'POST':
-        profile = user.profile
-        profile.education = request.form.get('education')
-        profile.profession = request.form.get('profession')
-        profile.is_working = request.form.get('is_working') == 'true'
-
-        db.session.commit()
-        return redirect(url_for('profile.view'))
+        return _save_onboarding_step(user.profile, 'step4')
 
     return render_template('spa.html', user=user)
 
@@ -94,18 +90,10 @@ def onboarding_step4():
 @login_required
 def onboarding_step5():
     """Qadam 5: Juftga qo'yiladigan talablar"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if request.method == 'POST':
-        profile = user.profile
-        profile.partner_age_min = int(request.form.get('partner_age_min'))
-        profile.partner_age_max = int(request.form.get('partner_age_max'))
-        profile.partner_region = request.form.get('partner_region')
-        profile.partner_religious_level = request.form.get('partner_religious_level')
-        profile.partner_marital_status = request.form.get('partner_marital_status')
-
-        db.session.commit()
-        return redirect(url_for('profile.view'))
+        return _save_onboarding_step(user.profile, 'step5')
 
     return render_template('spa.html', user=user)
 
@@ -114,10 +102,10 @@ def onboarding_step5():
 @login_required
 def onboarding_complete():
     """Onboarding tugallandi"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     # Agar profil to'liq emas bo'lsa, profil sahifasiga qaytarish
-    if not user.profile or not user.profile.is_complete:
+    if not user.profile_completed:
         return redirect(url_for('profile.view'))
 
     # Agar bio allaqachon to'ldirilgan bo'lsa, activate sahifasiga yo'naltirish
@@ -138,7 +126,7 @@ def onboarding_complete():
 @login_required
 def activate_profile():
     """E'lonni faollashtirish - SPA ga yo'naltirish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if not user.profile_completed:
         return redirect(url_for('profile.onboarding'))
@@ -159,7 +147,7 @@ def activate_profile():
 @login_required
 def edit():
     """Profilni tahrirlash"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if request.method == 'POST':
         try:
@@ -206,8 +194,8 @@ def edit():
             profile.partner_religious_level = request.form.get('partner_religious_level') or profile.partner_religious_level
             profile.partner_marital_status = request.form.get('partner_marital_status') or profile.partner_marital_status
 
-            # is_complete property avtomatik barcha maydonlar to'ldirilganini tekshiradi
-            # Shuning uchun uni alohida set qilish shart emas
+            # is_complete va completion_pct ustunlari flush paytida (before_flush hook)
+            # avtomatik yangilanadi, shuning uchun ularni alohida set qilish shart emas
 
             db.session.commit()
 
@@ -225,7 +213,7 @@ def edit():
 @login_required
 def view():
     """O'z profilini ko'rish - SPA ga yo'naltirish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
     return render_template('spa.html', user=user)
 
 
@@ -233,7 +221,7 @@ def view():
 @login_required
 def toggle_active():
     """E'lonni yoqish/o'chirish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if user.profile.is_active:
         user.profile.deactivate()
@@ -252,13 +240,171 @@ def toggle_active():
     })
 
 
+@profile_bp.route('/api/photo', methods=['POST', 'DELETE'])
+@login_required
+def upload_photo():
+    """Profil rasmini yuklash (multipart 'photo' yoki xom image/* tanasi) yoki o'chirish
+
+    Fayl diskka bo'laklab yoziladi, o'lchamlar fonda yaratiladi - javob darhol qaytadi.
+    """
+    user = g.current_user
+    profile = user.profile
+
+    if request.method == 'DELETE':
+        profile.photo_hash = None
+        db.session.commit()
+        return jsonify({'success': True, 'photo_url': None, 'photo_thumb_url': None})
+
+    photo = request.files.get('photo')
+    if photo is not None:
+        stream = photo.stream
+    elif request.mimetype.startswith('image/'):
+        stream = request.stream
+    else:
+        return jsonify({'error': 'Rasm kerak'}), 400
+
+    try:
+        profile.photo_hash = photo_store.save(stream)
+    except PhotoTooLarge:
+        return jsonify({'error': 'Rasm hajmi juda katta'}), 413
+    except InvalidPhoto:
+        return jsonify({'error': 'Faqat rasm fayllari qabul qilinadi'}), 400
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'photo_url': photo_store.url(profile.photo_hash, 'full'),
+        'photo_thumb_url': photo_store.url(profile.photo_hash, 'thumb')
+    })
+
+
 @profile_bp.route('/api/progress')
 @login_required
 def get_progress():
     """Profil to'ldirilganlik foizini olish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     return jsonify({
         'completion_percentage': user.profile.completion_percentage,
-        'is_complete': user.profile.is_complete
+        'is_complete': user.profile_completed
+    })
+
+
+def _parse_int(value):
+    if isinstance(value, bool):
+        raise ValueError
+    return int(value)
+
+
+def _parse_onboarding_fields(data):
+    """So'rovdagi profil maydonlarini tekshirish: (qiymatlar, xatolar) - noma'lum kalitlar e'tiborsiz"""
+    current_year = datetime.utcnow().year
+    values, errors = {}, {}
+    fields = [field for step_fields in ONBOARDING_STEPS.values() for field in step_fields]
+
+    for field in fields:
+        if field not in data:
+            continue
+        value = data[field]
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            errors[field] = "Maydon to'ldirilishi kerak"
+            continue
+
+        column_type = Profile.__table__.c[field].type
+        try:
+            if field == 'gender':
+                if value not in ('Erkak', 'Ayol'):
+                    raise ValueError
+            elif isinstance(column_type, CodedString):
+                if value not in column_type.codes:
+                    raise ValueError
+            elif field == 'is_working':
+                if value not in (True, False, 'true', 'false'):
+                    raise ValueError
+                value = value in (True, 'true')
+            elif field == 'birth_year':
+                value = _parse_int(value)
+                if not current_year - 80 <= value <= current_year - 18:
+                    raise ValueError
+            elif field in INT_FIELD_RANGES:
+                value = _parse_int(value)
+                low, high = INT_FIELD_RANGES[field]
+                if not low <= value <= high:
+                    raise ValueError
+            elif not isinstance(value, str) or len(value) > TEXT_FIELD_LIMITS[field]:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors[field] = "Noto'g'ri qiymat"
+            continue
+        values[field] = value
+
+    return values, errors
+
+
+def _validate_profile_fields(profile, data):
+    """Maydonlarni tekshirish va juft yoshi oralig'ini profildagi qiymatlar bilan solishtirish"""
+    values, errors = _parse_onboarding_fields(data)
+
+    partner_age_min = values.get('partner_age_min', profile.partner_age_min)
+    partner_age_max = values.get('partner_age_max', profile.partner_age_max)
+    if partner_age_min and partner_age_max and partner_age_min > partner_age_max:
+        errors.setdefault('partner_age_max', "Maksimal yosh minimaldan kichik bo'lmasligi kerak")
+    return values, errors
+
+
+def _save_onboarding_step(profile, step):
+    """Eski /onboarding/stepN formasi: qadam maydonlarini tekshirib saqlash
+
+    Lug'atda yo'q qiymat (eskirgan yoki o'zgartirilgan forma) 500 emas, 400 qaytaradi.
+    """
+    data = {field: request.form.get(field) for field in ONBOARDING_STEPS[step]}
+    if step == 'step4':
+        # Checkbox yuborilmasa - ishlamaydi
+        data['is_working'] = 'true' if data['is_working'] == 'true' else 'false'
+
+    values, errors = _validate_profile_fields(profile, data)
+    if errors:
+        return jsonify({'error': "Ma'lumotlar noto'g'ri", 'fields': errors}), 400
+
+    for field, value in values.items():
+        setattr(profile, field, value)
+    db.session.commit()
+    return redirect(url_for('profile.view'))
+
+
+@profile_bp.route('/api/onboarding', methods=['POST'])
+@login_required
+def save_onboarding():
+    """Onboarding (barcha yoki bir nechta qadam) bitta so'rovda: tekshirish, bitta commit
+
+    JSON (yoki form) dagi maydonlar ONBOARDING_STEPS dan olinadi, yuborilmagan maydonlar
+    o'zgarmaydi. Javobda yangi to'liqlik holati qaytariladi.
+    """
+    user = g.current_user
+    profile = user.profile
+    data = request.get_json(silent=True)
+    if data is None:
+        data = request.form.to_dict()
+    if not isinstance(data, dict):
+        return jsonify({'error': "Ma'lumotlar JSON obyekt bo'lishi kerak"}), 400
+
+    values, errors = _validate_profile_fields(profile, data)
+    if errors:
+        return jsonify({'error': "Ma'lumotlar noto'g'ri", 'fields': errors}), 400
+
+    for field, value in values.items():
+        setattr(profile, field, value)
+    # is_complete va completion_pct flush paytida yangilanadi
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'completion_percentage': profile.completion_percentage,
+        'is_complete': user.profile_completed,
+        'completed_steps': [
+            step for step, step_fields in ONBOARDING_STEPS.items()
+            if all(getattr(profile, field) not in (None, '') for field in step_fields)
+        ]
     })
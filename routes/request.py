@@ -1,9 +1,11 @@
-from flask import Blueprint, render_template, request, session, jsonify, current_app
-from models import User, MatchRequest
+from flask import Blueprint, render_template, request, g, jsonify, current_app
+from models import User, MatchRequest, UserPair, Profile
 from database import db
 from routes.auth import login_required, profile_required
 from telegram_bot import send_notification
 from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 import asyncio
 
 request_bp = Blueprint('request', __name__, url_prefix='/requests')
@@ -13,21 +15,33 @@ request_bp = Blueprint('request', __name__, url_prefix='/requests')
 @profile_required
 def index():
     """So'rovlar sahifasi - SPA ga yo'naltirish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
     return render_template('spa.html', user=user)
 
 
+def _requests_query(fields):
+    """So'rovlar + yuboruvchi/qabul qiluvchi profillari - fields berilsa faqat kerakli ustunlar"""
+    loaders = []
+    for relation in (MatchRequest.sender, MatchRequest.receiver):
+        loader = joinedload(relation).joinedload(User.profile)
+        if fields is not None:
+            loader = loader.load_only(*Profile.columns_for(fields))
+        loaders.append(loader)
+    return MatchRequest.query.options(*loaders)
+
+
 @request_bp.route('/api/sent')
 @profile_required
 def get_sent_requests():
     """Yuborilgan so'rovlar (barcha statuslar)"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
+    fields = Profile.fields_from_args(request.args)
 
-    sent_requests = MatchRequest.query.filter_by(
+    sent_requests = _requests_query(fields).filter_by(
         sender_id=current_user.id
     ).order_by(MatchRequest.created_at.desc()).all()
 
-    requests_data = [req.to_dict() for req in sent_requests]
+    requests_data = [req.to_dict(fields) for req in sent_requests]
 
     return jsonify({
         'requests': requests_data,
@@ -39,15 +53,16 @@ def get_sent_requests():
 @profile_required
 def get_received_requests():
     """Qabul qilingan so'rovlar (faqat pending)"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
+    fields = Profile.fields_from_args(request.args)
 
     # Faqat pending so'rovlarni ko'rsatish (accepted so'rovlar "Chatlar" bo'limida)
-    received_requests = MatchRequest.query.filter(
+    received_requests = _requests_query(fields).filter(
         MatchRequest.receiver_id == current_user.id,
         MatchRequest.status == 'pending'
     ).order_by(MatchRequest.created_at.desc()).all()
 
-    requests_data = [req.to_dict() for req in received_requests]
+    requests_data = [req.to_dict(fields) for req in received_requests]
 
     return jsonify({
         'requests': requests_data,
@@ -59,17 +74,18 @@ def get_received_requests():
 @profile_required
 def get_accepted_requests():
     """Qabul qilingan so'rovlar (chat bilan)"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
+    fields = Profile.fields_from_args(request.args)
 
     # Qabul qilingan so'rovlar (chat bilan)
-    accepted_requests = MatchRequest.query.filter(
+    accepted_requests = _requests_query(fields).filter(
         db.or_(
             db.and_(MatchRequest.sender_id == current_user.id, MatchRequest.status == 'accepted'),
             db.and_(MatchRequest.receiver_id == current_user.id, MatchRequest.status == 'accepted')
         )
     ).order_by(MatchRequest.responded_at.desc()).all()
 
-    requests_data = [req.to_dict() for req in accepted_requests]
+    requests_data = [req.to_dict(fields) for req in accepted_requests]
 
     return jsonify({
         'requests': requests_data,
@@ -81,7 +97,7 @@ def get_accepted_requests():
 @profile_required
 def send_request():
     """So'rov yuborish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
     data = request.get_json()
 
     receiver_id = data.get('receiver_id')
@@ -107,31 +123,32 @@ def send_request():
     if active_tariff.requests_count <= 0:
         return jsonify({'error': 'So\'rovlar tugagan. Yangi tarif sotib oling.'}), 400
 
-    # Allaqachon so'rov yuborilganmi? (ikki tomonlama tekshirish)
-    existing_request = MatchRequest.query.filter(
-        db.or_(
-            db.and_(MatchRequest.sender_id == current_user.id, MatchRequest.receiver_id == receiver_id),
-            db.and_(MatchRequest.sender_id == receiver_id, MatchRequest.receiver_id == current_user.id)
-        )
-    ).first()
+    # Allaqachon so'rov yuborilganmi? (ikki tomonlama - user_pairs jadvalidan)
+    existing_pair = UserPair.between(current_user.id, receiver_id)
 
-    if existing_request:
-        if existing_request.status == 'accepted' and existing_request.chat:
-            return jsonify({'error': 'Chat allaqachon mavjud', 'chat_id': existing_request.chat.id}), 400
+    if existing_pair:
+        if existing_pair.status == 'accepted' and existing_pair.chat_id:
+            return jsonify({'error': 'Chat allaqachon mavjud', 'chat_id': existing_pair.chat_id}), 400
         return jsonify({'error': 'Allaqachon so\'rov yuborgan'}), 400
 
     # So'rov yaratish
     new_request = MatchRequest(
         sender_id=current_user.id,
         receiver_id=receiver_id,
-        message=message
+        message=message,
+        status='pending'
     )
     db.session.add(new_request)
-
-    # Tarifdan so'rov ayirish
-    active_tariff.use_request()
-
-    db.session.commit()
+    UserPair.open(new_request)
+
+    # Tarifdan so'rov ayirish (so'rov va juftlik bilan bitta commit'da)
+    try:
+        active_tariff.use_request()
+        db.session.commit()
+    except IntegrityError:
+        # Parallel so'rov shu juftlikni allaqachon yaratgan
+        db.session.rollback()
+        return jsonify({'error': 'Allaqachon so\'rov yuborgan'}), 400
 
     # Qabul qiluvchiga bildirishnoma yuborish
     def send_notifications():
@@ -187,7 +204,7 @@ def send_request():
 @profile_required
 def accept_request(request_id):
     """So'rovni qabul qilish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     match_request = MatchRequest.query.get(request_id)
 
@@ -265,7 +282,7 @@ def accept_request(request_id):
 @profile_required
 def reject_request(request_id):
     """So'rovni rad etish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     match_request = MatchRequest.query.get(request_id)
 
@@ -325,7 +342,7 @@ def reject_request(request_id):
 @profile_required
 def cancel_request(request_id):
     """So'rovni bekor qilish"""
-    current_user = User.query.get(session['user_id'])
+    current_user = g.current_user
 
     match_request = MatchRequest.query.get(request_id)
 
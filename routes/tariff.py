@@ -1,5 +1,6 @@
-from flask import Blueprint, render_template, request, session, jsonify, current_app
-from models import User, UserTariff, PaymentRequest
+from flask import Blueprint, render_template, request, g, jsonify, current_app
+from models import UserTariff, PaymentRequest
+from models.lookup import LOOKUPS
 from database import db
 from routes.auth import login_required
 from config import Config
@@ -13,7 +14,7 @@ tariff_bp = Blueprint('tariff', __name__, url_prefix='/tariff')
 @login_required
 def purchase():
     """Tarif sotib olish sahifasi"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
     bot_username = getattr(Config, 'TELEGRAM_BOT_USERNAME', 'nikoh_bot')
     
     # Obuna ma'lumotlarini olish
@@ -33,7 +34,7 @@ def purchase():
 @login_required
 def get_status():
     """Foydalanuvchining tarif holatini olish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     if not user.has_active_tariff:
         return jsonify({
@@ -60,7 +61,7 @@ def get_status():
 @login_required
 def my_tariffs():
     """Mening tariflarim"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     # Barcha tariflar (aktiv va o'tgan)
     tariffs = UserTariff.query.filter_by(user_id=user.id).order_by(
@@ -76,7 +77,7 @@ def my_tariffs():
 @login_required
 def create_payment_request():
     """To'lov so'rovini yaratish va rasmni yuborish"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
     
     # Form data yoki JSON tekshirish
     if request.content_type and 'multipart/form-data' in request.content_type:
@@ -95,6 +96,9 @@ def create_payment_request():
     
     if not tariff_name or not amount:
         return jsonify({'error': 'Tarif nomi va summa kerak'}), 400
+
+    if tariff_name not in LOOKUPS['tariff_name']:
+        return jsonify({'error': 'Noma\'lum tarif'}), 400
     
     if not receipt_image and request.content_type and 'multipart/form-data' in request.content_type:
         return jsonify({'error': 'To\'lov cheki rasmi kerak'}), 400
@@ -181,7 +185,7 @@ def get_tariffs():
 @login_required
 def payment_instructions():
     """To'lov yo'riqnomasi"""
-    user = User.query.get(session['user_id'])
+    user = g.current_user
 
     tariff_info = {
         'name': 'KUMUSH',
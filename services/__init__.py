@@ -0,0 +1,3 @@
+from .cache import TTLCache, invalidate_on_commit
+
+__all__ = ['TTLCache', 'invalidate_on_commit']
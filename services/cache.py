@@ -0,0 +1,92 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+import threading
+import time
+
+
+class TTLCache:
+    """Jarayon (worker) ichidagi qisqa muddatli kesh - TTL va hajm chegarasi bilan"""
+
+    def __init__(self, ttl=30, max_entries=512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Qiymatni olish, muddati o'tgan yoki yo'q bo'lsa None"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Qiymatni saqlash (eng eski yozuvlar hajm oshganda chiqarib yuboriladi)"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def discard(self, key):
+        """Bitta yozuvni o'chirish"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Keshni tozalash"""
+        with self._lock:
+            self._data.clear()
+
+
+# (kesh, modellar) juftliklari - commit'dan keyin tozalanadiganlar
+_commit_invalidations = []
+
+
+def invalidate_on_commit(cache, *models):
+    """Berilgan modellardagi qatorlar o'zgarib commit qilinganda keshni tozalash"""
+    _commit_invalidations.append((cache, models))
+
+
+def mark_changed(session, *models):
+    """ORM flush'siz (Core INSERT/UPDATE) o'zgartirilgan modellar keshlarini commit'da tozalashga belgilash"""
+    pending = session.info.setdefault('pending_cache_invalidations', set())
+    for index, (cache, cache_models) in enumerate(_commit_invalidations):
+        if any(issubclass(model, cache_models) for model in models):
+            pending.add(index)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_invalidations(session, flush_context):
+    """Flush qilingan o'zgarishlarga qarab qaysi keshlar tozalanishini belgilash"""
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if not changed:
+        return
+
+    pending = session.info.setdefault('pending_cache_invalidations', set())
+    for index, (cache, models) in enumerate(_commit_invalidations):
+        if index not in pending and any(isinstance(obj, models) for obj in changed):
+            pending.add(index)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    """Commit muvaffaqiyatli bo'lgach belgilangan keshlarni tozalash"""
+    for index in session.info.pop('pending_cache_invalidations', ()):
+        _commit_invalidations[index][0].clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    """Rollback bo'lsa belgilarni bekor qilish"""
+    session.info.pop('pending_cache_invalidations', None)
@@ -0,0 +1,91 @@
+from database import db
+from models import User, UserPair
+from services.cache import TTLCache
+from config import Config
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+import numpy as np
+
+
+class FeedExclusions:
+    """Feed'dan chiqarib tashlanadigan foydalanuvchilar (worker ichida)
+
+    Har bir foydalanuvchi uchun saralangan int massiv: u so'rov yuborgan, so'rov olgan
+    yoki chat ochgan foydalanuvchilar (user_pairs jadvalidan) va bloklangan foydalanuvchilar.
+    Sahifalarga np.isin orqali qo'llanadi - feed so'roviga qo'shimcha join kerak emas.
+    """
+
+    def __init__(self, ttl, max_entries=4096):
+        self._contacted = TTLCache(ttl=ttl, max_entries=max_entries)
+        self._blocked = TTLCache(ttl=ttl, max_entries=1)
+
+    def _blocked_ids(self):
+        blocked_ids = self._blocked.get('blocked')
+        if blocked_ids is None:
+            blocked_ids = np.array(
+                sorted(user_id for (user_id,) in db.session.query(User.id).filter(User.is_blocked == True)),
+                dtype=np.int64
+            )
+            self._blocked.set('blocked', blocked_ids)
+        return blocked_ids
+
+    def _contacted_ids(self, user_id):
+        contacted_ids = self._contacted.get(user_id)
+        if contacted_ids is None:
+            rows = db.session.query(UserPair.user_low_id, UserPair.user_high_id).filter(
+                db.or_(UserPair.user_low_id == user_id, UserPair.user_high_id == user_id)
+            )
+            contacted_ids = np.array(
+                sorted(high if low == user_id else low for low, high in rows),
+                dtype=np.int64
+            )
+            self._contacted.set(user_id, contacted_ids)
+        return contacted_ids
+
+    def for_user(self, user_id):
+        """Foydalanuvchi feed'ida ko'rsatilmaydigan user ID lar (saralangan massiv)"""
+        return np.union1d(self._contacted_ids(user_id), self._blocked_ids())
+
+    def discard(self, user_ids):
+        """Berilgan foydalanuvchilar massivlarini qayta qurishga belgilash"""
+        for user_id in user_ids:
+            self._contacted.discard(user_id)
+
+    def clear_blocked(self):
+        """Bloklanganlar ro'yxatini qayta qurishga belgilash"""
+        self._blocked.clear()
+
+    def clear(self):
+        """Barcha massivlarni qayta qurishga belgilash"""
+        self._contacted.clear()
+        self._blocked.clear()
+
+
+# Worker bo'yicha umumiy chiqarib tashlash to'plami
+feed_exclusions = FeedExclusions(ttl=Config.FEED_EXCLUSIONS_TTL)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_exclusion_changes(session, flush_context):
+    """So'rov yaratilgan/holati o'zgargan juftliklar va bloklash o'zgarishlarini belgilash"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, UserPair):
+            pending = session.info.setdefault('pending_exclusion_users', set())
+            pending.update((obj.user_low_id, obj.user_high_id))
+        elif isinstance(obj, User) and inspect(obj).attrs.is_blocked.history.has_changes():
+            session.info['pending_blocked_change'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_exclusion_changes(session):
+    """Commit muvaffaqiyatli bo'lgach tegishli massivlarni tozalash"""
+    feed_exclusions.discard(session.info.pop('pending_exclusion_users', ()))
+    if session.info.pop('pending_blocked_change', False):
+        feed_exclusions.clear_blocked()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_exclusion_changes(session):
+    """Rollback bo'lsa belgilarni bekor qilish"""
+    session.info.pop('pending_exclusion_users', None)
+    session.info.pop('pending_blocked_change', None)
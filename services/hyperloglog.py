@@ -0,0 +1,48 @@
+import hashlib
+import math
+import numpy as np
+
+# 2^10 = 1024 registr (1 KB) - standart xato ~3.3%
+PRECISION = 10
+
+
+class HyperLogLog:
+    """Noyob qiymatlar sonini baholash uchun kichik sketch (HyperLogLog)
+
+    Registrlar bayt sifatida saqlanadi va birlashtiriladi (har registr bo'yicha maksimum),
+    shuning uchun worker'lar va kunlar sketch'larini qo'shish mumkin.
+    """
+
+    def __init__(self, registers=None):
+        self.registers = np.zeros(1 << PRECISION, dtype=np.uint8) if registers is None else registers
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(np.frombuffer(data, dtype=np.uint8).copy())
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+    def add(self, value):
+        """Qiymatni qo'shish (masalan ko'ruvchi user_id)"""
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        index = hashed >> (64 - PRECISION)
+        remaining = hashed & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        """Noyob qiymatlar soni (taxminiy)"""
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        raw = alpha * size * size / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * size and zeros:
+            # Kichik qiymatlar uchun linear counting
+            return int(round(size * math.log(size / zeros)))
+        return int(round(raw))
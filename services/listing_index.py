@@ -0,0 +1,223 @@
+from database import db
+from models import Profile
+from services.cache import invalidate_on_commit
+from datetime import datetime, timedelta
+import numpy as np
+import threading
+import time
+
+# "Farqi yo'q" tanlovi - talab qo'yilmagan
+ANY_VALUE = 'Istalgan'
+
+# Snapshot ustunlari: atribut nomi -> Profile ustuni
+INT_COLUMNS = {
+    'profile_ids': 'id',
+    'user_ids': 'user_id',
+    'birth_years': 'birth_year',
+    'heights': 'height',
+    'weights': 'weight',
+    'partner_age_min': 'partner_age_min',
+    'partner_age_max': 'partner_age_max',
+}
+CATEGORY_COLUMNS = {
+    'genders': 'gender',
+    'regions': 'region',
+    'religious_levels': 'religious_level',
+    'marital_statuses': 'marital_status',
+    'educations': 'education',
+    'partner_regions': 'partner_region',
+    'partner_religious_levels': 'partner_religious_level',
+    'partner_marital_statuses': 'partner_marital_status',
+}
+TIME_COLUMNS = {
+    'activated_at': 'activated_at',
+    'top_until': 'top_until',
+}
+
+# Commit va updated_at orasidagi farq tufayli qatorlar tushib qolmasligi uchun
+# inkremental yangilash oxirgi ko'rilgan vaqtdan biroz oldindan boshlanadi
+INCREMENTAL_OVERLAP = timedelta(seconds=60)
+
+
+class ListingSnapshot:
+    """Profillarning ustunli ko'rinishi (NumPy massivlari)
+
+    Kategoriyalar bitta umumiy lug'at bilan kodlanadi (None -> -1), shuning uchun
+    masalan partner_region va region ustunlarini to'g'ridan-to'g'ri solishtirish mumkin.
+    """
+
+    any_code = 0
+
+    def __init__(self, columns, vocab):
+        self.vocab = vocab
+        for name, values in columns.items():
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.profile_ids)
+
+    def take(self, indexes):
+        """Berilgan qatorlardan iborat yangi snapshot"""
+        columns = {name: values[indexes] for name, values in self._columns()}
+        return ListingSnapshot(columns, self.vocab)
+
+    def _columns(self):
+        return [(name, value) for name, value in vars(self).items() if isinstance(value, np.ndarray)]
+
+    def code(self, value):
+        """Qiymat kodi (lug'atda yo'q qiymat hech narsaga mos kelmaydi)"""
+        if value is None:
+            return -1
+        return self.vocab.get(value, -2)
+
+    def codes(self, values):
+        return [self.code(value) for value in values]
+
+    def ages(self, now=None):
+        now = now or datetime.utcnow()
+        return np.where(self.birth_years > 0, now.year - self.birth_years, -1)
+
+    def is_top(self, now=None):
+        now = now or datetime.utcnow()
+        return self.top_until > now.timestamp()
+
+    def filter_mask(self, filters, now=None):
+        """Filterlarni vektor maskalar sifatida qo'llash
+
+        filters: age_min/age_max, height_min/height_max (int), region, religious_level,
+        marital_status, education (qiymatlar ro'yxati), is_working (bool)
+        """
+        mask = self.is_active.copy()
+
+        if 'age_min' in filters or 'age_max' in filters:
+            ages = self.ages(now)
+            mask &= ages >= filters.get('age_min', 0)
+            if 'age_max' in filters:
+                mask &= ages <= filters['age_max']
+        if 'height_min' in filters:
+            mask &= self.heights >= filters['height_min']
+        if 'height_max' in filters:
+            mask &= (self.heights > 0) & (self.heights <= filters['height_max'])
+
+        for name, attribute in (('region', 'regions'), ('religious_level', 'religious_levels'),
+                                ('marital_status', 'marital_statuses'), ('education', 'educations')):
+            if filters.get(name):
+                mask &= np.isin(getattr(self, attribute), self.codes(filters[name]))
+
+        if 'is_working' in filters:
+            mask &= self.is_working == int(filters['is_working'])
+
+        return mask
+
+    def feed_order(self, indexes, now=None):
+        """Qatorlarni feed tartibida saralash: TOP, activated_at, id (hammasi kamayish)"""
+        order = np.lexsort((
+            -self.profile_ids[indexes],
+            -self.activated_at[indexes],
+            -self.is_top(now)[indexes].astype(np.int8)
+        ))
+        return indexes[order]
+
+
+class ListingIndex:
+    """Worker ichidagi profillar snapshot'i, Profile.updated_at bo'yicha inkremental yangilanadi"""
+
+    def __init__(self, refresh_interval=5, rebuild_interval=600):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._vocab = {ANY_VALUE: 0}
+        self._rows = {}  # profile_id -> qator raqami
+        self._size = 0
+        self._columns = self._allocate(1024)
+        self._last_updated_at = None
+        self._built_at = time.monotonic()
+        self._checked_at = None
+
+    @staticmethod
+    def _allocate(capacity):
+        columns = {name: np.zeros(capacity, dtype=np.int64) for name in INT_COLUMNS}
+        columns.update({name: np.full(capacity, -1, dtype=np.int32) for name in CATEGORY_COLUMNS})
+        columns.update({name: np.full(capacity, -np.inf) for name in TIME_COLUMNS})
+        columns['is_active'] = np.zeros(capacity, dtype=bool)
+        columns['is_working'] = np.full(capacity, -1, dtype=np.int8)
+        return columns
+
+    def _grow(self):
+        capacity = len(self._columns['profile_ids']) * 2
+        grown = self._allocate(capacity)
+        for name, values in self._columns.items():
+            grown[name][:self._size] = values[:self._size]
+        self._columns = grown
+
+    def _encode(self, value):
+        if value is None:
+            return -1
+        return self._vocab.setdefault(value, len(self._vocab))
+
+    def _write_row(self, row):
+        position = self._rows.get(row.id)
+        if position is None:
+            if self._size == len(self._columns['profile_ids']):
+                self._grow()
+            position = self._size
+            self._rows[row.id] = position
+            self._size += 1
+
+        columns = self._columns
+        for name, attribute in INT_COLUMNS.items():
+            columns[name][position] = getattr(row, attribute) or 0
+        for name, attribute in CATEGORY_COLUMNS.items():
+            columns[name][position] = self._encode(getattr(row, attribute))
+        for name, attribute in TIME_COLUMNS.items():
+            value = getattr(row, attribute)
+            columns[name][position] = value.timestamp() if value else -np.inf
+        columns['is_active'][position] = bool(row.is_active)
+        columns['is_working'][position] = -1 if row.is_working is None else int(row.is_working)
+
+    def refresh(self, force=False):
+        """O'zgargan profillarni (updated_at bo'yicha) snapshot'ga yozish"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+                return
+
+            # O'chirilgan profillarni tozalash uchun vaqti-vaqti bilan to'liq qayta qurish
+            if now - self._built_at > self.rebuild_interval:
+                self._reset()
+
+            attributes = set(INT_COLUMNS.values()) | set(CATEGORY_COLUMNS.values()) | set(TIME_COLUMNS.values())
+            query = db.session.query(
+                *[getattr(Profile, attribute) for attribute in sorted(attributes)],
+                Profile.is_active, Profile.is_working, Profile.updated_at
+            )
+            if self._last_updated_at is not None:
+                query = query.filter(Profile.updated_at >= self._last_updated_at - INCREMENTAL_OVERLAP)
+
+            for row in query.all():
+                self._write_row(row)
+                if row.updated_at and (self._last_updated_at is None or row.updated_at > self._last_updated_at):
+                    self._last_updated_at = row.updated_at
+
+            if self._last_updated_at is None:
+                self._last_updated_at = datetime.utcnow()
+            self._checked_at = now
+
+    def clear(self):
+        """Keyingi o'qishda yangilashni majburlash (commit'dan keyin chaqiriladi)"""
+        self._checked_at = None
+
+    def snapshot(self):
+        """Yangilangan snapshot'ni olish"""
+        self.refresh()
+        with self._lock:
+            columns = {name: values[:self._size] for name, values in self._columns.items()}
+            return ListingSnapshot(columns, dict(self._vocab))
+
+
+# Worker bo'yicha umumiy indeks - Profile commit qilinganda keyingi o'qishda yangilanadi
+listing_index = ListingIndex()
+invalidate_on_commit(listing_index, Profile)
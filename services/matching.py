@@ -0,0 +1,73 @@
+from services.listing_index import ANY_VALUE
+from datetime import datetime
+import numpy as np
+
+# Ikki tomonlama moslik mezonlari soni (4 ta mening talabim + 4 ta ularning talabi)
+MATCH_CRITERIA = 8
+
+
+def _preference_mask(pool, preference, values):
+    """Mening talabim (bitta qiymat) ularning ustuniga mosmi"""
+    if not preference or preference == ANY_VALUE:
+        return np.ones(len(pool), dtype=bool)
+    return values == pool.code(preference)
+
+
+def _reverse_preference_mask(pool, preferences, value):
+    """Ularning talablari (ustun) mening qiymatimga mosmi"""
+    return (preferences == -1) | (preferences == pool.any_code) | (preferences == pool.code(value))
+
+
+def match_scores(viewer, pool, now=None):
+    """Ko'ruvchi profili va pool'dagi har bir nomzod uchun ikki tomonlama moslik bali (0..8)
+
+    pool - services.listing_index.ListingSnapshot (nomzodlar qatorlari)
+    """
+    now = now or datetime.utcnow()
+    ages = pool.ages(now)
+    my_age = now.year - viewer.birth_year if viewer.birth_year else None
+
+    # Ularning ma'lumotlari mening talablarimga
+    age_ok = ages >= 0
+    if viewer.partner_age_min:
+        age_ok &= ages >= viewer.partner_age_min
+    if viewer.partner_age_max:
+        age_ok &= ages <= viewer.partner_age_max
+    if not viewer.partner_age_min and not viewer.partner_age_max:
+        age_ok = np.ones(len(pool), dtype=bool)
+
+    score = age_ok.astype(np.int8)
+    score += _preference_mask(pool, viewer.partner_region, pool.regions)
+    score += _preference_mask(pool, viewer.partner_religious_level, pool.religious_levels)
+    score += _preference_mask(pool, viewer.partner_marital_status, pool.marital_statuses)
+
+    # Mening ma'lumotlarim ularning talablariga
+    if my_age is None:
+        their_age_ok = (pool.partner_age_min == 0) & (pool.partner_age_max == 0)
+    else:
+        their_age_ok = (
+            ((pool.partner_age_min == 0) | (pool.partner_age_min <= my_age)) &
+            ((pool.partner_age_max == 0) | (pool.partner_age_max >= my_age))
+        )
+    score += their_age_ok
+    score += _reverse_preference_mask(pool, pool.partner_regions, viewer.region)
+    score += _reverse_preference_mask(pool, pool.partner_religious_levels, viewer.religious_level)
+    score += _reverse_preference_mask(pool, pool.partner_marital_statuses, viewer.marital_status)
+
+    return score
+
+
+def rank_by_match(viewer, pool, now=None):
+    """Pool qatorlarini moslik bo'yicha saralash: bal, TOP, yangilik, id (hammasi kamayish)
+
+    Qaytaradi: (saralangan pool pozitsiyalari, ballar massivi)
+    """
+    now = now or datetime.utcnow()
+    scores = match_scores(viewer, pool, now)
+    order = np.lexsort((
+        -pool.profile_ids,
+        -pool.activated_at,
+        -pool.is_top(now).astype(np.int8),
+        -scores
+    ))
+    return order, scores
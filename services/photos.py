@@ -0,0 +1,194 @@
+from config import Config
+from services.cache import TTLCache
+from PIL import Image, ImageOps
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# O'lchamlar: nom -> eng katta tomon (px). Feed kartalari 'thumb', profil sahifasi 'full'
+PHOTO_SIZES = {
+    'avatar': 96,
+    'thumb': 400,
+    'full': 1080,
+}
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+CHUNK_SIZE = 64 * 1024
+# O'lchamlari yaratilmagan rasm media so'rovida shu vaqtdan keyin qayta navbatga qo'yiladi
+RENDER_RETRY_SECONDS = 300
+
+
+class PhotoTooLarge(Exception):
+    """Yuklangan rasm PHOTO_MAX_BYTES dan katta"""
+
+
+class InvalidPhoto(Exception):
+    """Yuklangan fayl rasm emas"""
+
+
+def photo_dir(content_hash):
+    """Rasm fayllari papkasi: MEDIA_DIR/photos/<2 belgi>/<sha256>"""
+    return os.path.join(Config.MEDIA_DIR, 'photos', content_hash[:2], content_hash)
+
+
+def variant_path(content_hash, size):
+    return os.path.join(photo_dir(content_hash), f'{size}.jpg')
+
+
+def original_path(content_hash):
+    return os.path.join(photo_dir(content_hash), 'original')
+
+
+def original_mimetype(content_hash):
+    """Asl rasm MIME turi (faqat sarlavha o'qiladi)"""
+    with Image.open(original_path(content_hash)) as image:
+        return Image.MIME.get(image.format, 'application/octet-stream')
+
+
+def has_variants(content_hash):
+    return all(os.path.exists(variant_path(content_hash, size)) for size in PHOTO_SIZES)
+
+
+def render_variants(content_hash):
+    """Asl rasmdan barcha o'lchamlarni yaratish (jarayonlar pool'ida ishlaydi)
+
+    Fayllar avval vaqtinchalik nom bilan yoziladi va os.replace bilan almashtiriladi -
+    yarim yozilgan rasm hech qachon berilmaydi.
+    """
+    with Image.open(original_path(content_hash)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size, max_side in PHOTO_SIZES.items():
+            target = variant_path(content_hash, size)
+            if os.path.exists(target):
+                continue
+            variant = image.copy()
+            variant.thumbnail((max_side, max_side), Image.LANCZOS)
+            temp_target = f'{target}.{os.getpid()}.tmp'
+            variant.save(temp_target, 'JPEG', quality=85, optimize=True, progressive=True)
+            os.replace(temp_target, target)
+    return content_hash
+
+
+class PhotoStore:
+    """Profil rasmlari: diskka oqim bilan yozish, sha256 bo'yicha saqlash, o'lchamlarni fonda yaratish
+
+    Bir xil rasm (hash) ikkinchi marta yuklansa fayllar qayta yozilmaydi va qayta
+    ishlanmaydi. O'lchamlar jarayonlar pool'ida yaratiladi - so'rov oqimi kutmaydi.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._rendering = set()  # Navbatdagi hash'lar - bir rasm ikki marta yuborilmaydi
+        self._failed = TTLCache(ttl=RENDER_RETRY_SECONDS, max_entries=1024)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Pool birinchi yuklashda (worker jarayoni ichida) yaratiladi
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _reset_pool(self, executor):
+        """Buzilgan pool'ni tashlash - keyingi render yangisini yaratadi"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def render(self, content_hash):
+        """O'lchamlarni fonda yaratishni navbatga qo'yish
+
+        Rasm allaqachon navbatda bo'lsa yoki oxirgi RENDER_RETRY_SECONDS ichida xato bergan
+        bo'lsa qayta yuborilmaydi (media route har so'rovda chaqiradi).
+        """
+        with self._lock:
+            if content_hash in self._rendering or self._failed.get(content_hash):
+                return
+            self._rendering.add(content_hash)
+
+        executor = self._pool()
+        try:
+            future = executor.submit(render_variants, content_hash)
+        except (BrokenProcessPool, RuntimeError) as error:
+            self._reset_pool(executor)
+            self._render_failed(content_hash, error)
+            return
+        future.add_done_callback(lambda done: self._rendered(content_hash, executor, done))
+
+    def _rendered(self, content_hash, executor, future):
+        error = None if future.cancelled() else future.exception()
+        if error is None:
+            with self._lock:
+                self._rendering.discard(content_hash)
+            return
+        if isinstance(error, BrokenProcessPool):
+            self._reset_pool(executor)
+        self._render_failed(content_hash, error)
+
+    def _render_failed(self, content_hash, error):
+        with self._lock:
+            self._rendering.discard(content_hash)
+            self._failed.set(content_hash, True)
+        logger.error("Rasm o'lchamlari yaratilmadi: %s", content_hash, exc_info=error)
+
+    def save(self, stream):
+        """Yuklanayotgan faylni bo'laklab diskka yozish, hash hisoblash va o'lchamlarni navbatga qo'yish
+
+        Qaytaradi: rasmning sha256 hash'i. Xatolar: PhotoTooLarge, InvalidPhoto.
+        """
+        uploads_dir = os.path.join(Config.MEDIA_DIR, 'uploads')
+        os.makedirs(uploads_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, temp_path = tempfile.mkstemp(dir=uploads_dir)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > Config.PHOTO_MAX_BYTES:
+                        raise PhotoTooLarge()
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            # Faqat sarlavha tekshiriladi (to'liq dekodlash fonda)
+            try:
+                with Image.open(temp_path) as image:
+                    image.verify()
+            except Exception:
+                raise InvalidPhoto()
+
+            content_hash = digest.hexdigest()
+            os.makedirs(photo_dir(content_hash), exist_ok=True)
+            if os.path.exists(original_path(content_hash)):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, original_path(content_hash))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if not has_variants(content_hash):
+            self.render(content_hash)
+        return content_hash
+
+    @staticmethod
+    def url(content_hash, size):
+        """Rasm o'lchami URL'i (hash o'zgarmas - brauzer keshida abadiy saqlanadi)"""
+        if not content_hash:
+            return None
+        return f'/media/photos/{content_hash}/{size}.jpg'
+
+
+photo_store = PhotoStore(workers=Config.PHOTO_WORKERS)
@@ -0,0 +1,166 @@
+from database import db
+from models import Profile
+from services.cache import invalidate_on_commit
+from sqlalchemy import inspect, literal_column, select, table, text
+from bisect import bisect_left
+import re
+import threading
+
+# Qidiruv so'zlari: harf/raqam ketma-ketliklari (o'zbekcha apostrof ajratuvchi hisoblanadi)
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+MAX_QUERY_TOKENS = 5
+
+
+def tokenize(value):
+    """Matnni kichik harfli so'zlarga ajratish"""
+    return TOKEN_PATTERN.findall((value or '').lower())
+
+
+class SqliteFtsBackend:
+    """SQLite FTS5 - profiles jadvaliga bog'langan (external content) indeks, triggerlar bilan"""
+
+    name = 'sqlite_fts5'
+
+    def setup(self, engine):
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'profiles_fts'"
+            )).first()
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS profiles_fts USING fts5("
+                "bio, profession, content='profiles', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS profiles_fts_insert AFTER INSERT ON profiles BEGIN "
+                "INSERT INTO profiles_fts(rowid, bio, profession) VALUES (new.id, new.bio, new.profession); "
+                "END"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS profiles_fts_delete AFTER DELETE ON profiles BEGIN "
+                "INSERT INTO profiles_fts(profiles_fts, rowid, bio, profession) "
+                "VALUES ('delete', old.id, old.bio, old.profession); "
+                "END"
+            ))
+            conn.execute(text(
+                "CREATE TRIGGER IF NOT EXISTS profiles_fts_update AFTER UPDATE OF bio, profession ON profiles BEGIN "
+                "INSERT INTO profiles_fts(profiles_fts, rowid, bio, profession) "
+                "VALUES ('delete', old.id, old.bio, old.profession); "
+                "INSERT INTO profiles_fts(rowid, bio, profession) VALUES (new.id, new.bio, new.profession); "
+                "END"
+            ))
+            if not exists:
+                # Mavjud profillarni indekslash
+                conn.execute(text("INSERT INTO profiles_fts(profiles_fts) VALUES ('rebuild')"))
+
+    def condition(self, tokens):
+        # Har bir so'z prefiks bo'yicha, hammasi bo'lishi shart (FTS5 da bo'sh joy = AND)
+        match_query = ' '.join(f'"{token}"*' for token in tokens)
+        matching_ids = select(literal_column('rowid')).select_from(table('profiles_fts')).where(
+            text('profiles_fts MATCH :search_query').bindparams(search_query=match_query)
+        )
+        return Profile.id.in_(matching_ids)
+
+
+class MysqlFulltextBackend:
+    """MySQL FULLTEXT indeksi (bio, profession), BOOLEAN MODE qidiruv"""
+
+    name = 'mysql_fulltext'
+    index_name = 'ix_profiles_fulltext'
+
+    def setup(self, engine):
+        existing_indexes = {index['name'] for index in inspect(engine).get_indexes('profiles')}
+        if self.index_name not in existing_indexes:
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE profiles ADD FULLTEXT INDEX {self.index_name} (bio, profession)'))
+
+    def condition(self, tokens):
+        match_query = ' '.join(f'+{token}*' for token in tokens)
+        return text(
+            'MATCH (profiles.bio, profiles.profession) AGAINST (:search_query IN BOOLEAN MODE)'
+        ).bindparams(search_query=match_query)
+
+
+class MemoryBackend:
+    """Jarayon ichidagi inverted indeks (boshqa bazalar va testlar uchun)
+
+    Profile commit qilinganda keyingi qidiruvda qayta quriladi.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None  # so'z -> profile_id lar to'plami
+        self._vocabulary = []  # prefiks qidiruvi uchun saralangan so'zlar
+
+    def setup(self, engine):
+        invalidate_on_commit(self, Profile)
+
+    def clear(self):
+        with self._lock:
+            self._postings = None
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._postings is not None:
+                return self._postings, self._vocabulary
+
+            postings = {}
+            for profile_id, bio, profession in db.session.query(Profile.id, Profile.bio, Profile.profession):
+                for token in set(tokenize(bio) + tokenize(profession)):
+                    postings.setdefault(token, set()).add(profile_id)
+            self._postings = postings
+            self._vocabulary = sorted(postings)
+            return self._postings, self._vocabulary
+
+    def _prefix_matches(self, postings, vocabulary, prefix):
+        matches = set()
+        position = bisect_left(vocabulary, prefix)
+        while position < len(vocabulary) and vocabulary[position].startswith(prefix):
+            matches |= postings[vocabulary[position]]
+            position += 1
+        return matches
+
+    def condition(self, tokens):
+        postings, vocabulary = self._ensure_built()
+        matching_ids = None
+        for token in tokens:
+            token_ids = self._prefix_matches(postings, vocabulary, token)
+            matching_ids = token_ids if matching_ids is None else matching_ids & token_ids
+            if not matching_ids:
+                break
+        return Profile.id.in_(sorted(matching_ids or ()))
+
+
+class ProfileSearch:
+    """bio va profession bo'yicha to'liq matnli qidiruv - baza turiga qarab backend tanlanadi"""
+
+    def __init__(self):
+        self.backend = None
+
+    def setup(self, engine):
+        """Indeksni yaratish (init_db dan chaqiriladi)"""
+        if engine.dialect.name == 'sqlite':
+            self.backend = SqliteFtsBackend()
+        elif engine.dialect.name == 'mysql':
+            self.backend = MysqlFulltextBackend()
+        else:
+            self.backend = MemoryBackend()
+        self.backend.setup(engine)
+
+    @staticmethod
+    def parse_query(query):
+        """Qidiruv so'zlari (takrorlanmas, ko'pi bilan MAX_QUERY_TOKENS ta)"""
+        tokens = []
+        for token in tokenize(query):
+            if token not in tokens:
+                tokens.append(token)
+        return tokens[:MAX_QUERY_TOKENS]
+
+    def condition(self, tokens):
+        """Profile so'roviga qo'shiladigan shart: barcha so'zlar (prefiks) bio yoki profession da"""
+        return self.backend.condition(tokens)
+
+
+profile_search = ProfileSearch()
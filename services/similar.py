@@ -0,0 +1,108 @@
+from models import Profile
+from services.cache import TTLCache, invalidate_on_commit
+from services.listing_index import listing_index
+from config import Config
+from datetime import datetime
+import numpy as np
+
+# Diniy daraja tartibi (yaqin darajalar orasidagi masofa kichik)
+RELIGIOUS_LEVEL_ORDER = {'Yengil': 0, "O'rtacha": 1, 'Jiddiy': 2}
+
+# Belgilar masshtabi: shu farq masofaga 1 qo'shadi
+AGE_SCALE = 5
+HEIGHT_SCALE = 10
+WEIGHT_SCALE = 10
+
+# Qiymati noma'lum belgi uchun masofa
+MISSING_PENALTY = 1.0
+
+
+def _numeric_distance(values, target, scale):
+    """Sonli belgi bo'yicha kvadrat masofa (0 - noma'lum qiymat)"""
+    if not target:
+        return np.full(len(values), MISSING_PENALTY)
+    distance = ((values - target) / scale) ** 2
+    return np.where(values > 0, distance, MISSING_PENALTY)
+
+
+class SimilarProfiles:
+    """O'xshash profillar - listing_index snapshot'i ustidagi k-NN qidiruv
+
+    Belgilar vektori: yosh, bo'y, vazn (masshtablangan), diniy daraja (tartibli),
+    viloyat va ta'lim (farq qilsa 1). Natijalar profil bo'yicha keshlanadi va profil
+    commit qilinganda (tahrirlash, faollashtirish/o'chirish) tozalanadi; snapshot esa
+    Profile.updated_at bo'yicha inkremental yangilanadi.
+    """
+
+    def __init__(self, ttl, neighbours=30):
+        self.neighbours = neighbours
+        self._cache = TTLCache(ttl=ttl, max_entries=10000)
+
+    def clear(self):
+        self._cache.clear()
+
+    def _religious_order(self, snapshot):
+        """Snapshot kodlari -> diniy daraja tartibi (-1 noma'lum)
+
+        Oxirgi element -1 kodi (None) uchun: order[-1] == -1.
+        """
+        order = np.full(len(snapshot.vocab) + 1, -1, dtype=np.int8)
+        for value, rank in RELIGIOUS_LEVEL_ORDER.items():
+            code = snapshot.vocab.get(value)
+            if code is not None:
+                order[code] = rank
+        return order
+
+    def _compute(self, user_id):
+        snapshot = listing_index.snapshot()
+        positions = np.flatnonzero(snapshot.user_ids == user_id)
+        if not len(positions):
+            return []
+        target = positions[0]
+
+        # Faqat shu jinsdagi faol profillar (o'zidan tashqari)
+        candidates = snapshot.is_active & (snapshot.genders == snapshot.genders[target])
+        candidates[target] = False
+        positions = np.flatnonzero(candidates)
+        if not len(positions):
+            return []
+
+        now = datetime.utcnow()
+        ages = snapshot.ages(now)
+        target_age = ages[target] if ages[target] >= 0 else 0
+
+        distance = _numeric_distance(np.maximum(ages[positions], 0), target_age, AGE_SCALE)
+        distance += _numeric_distance(snapshot.heights[positions], snapshot.heights[target], HEIGHT_SCALE)
+        distance += _numeric_distance(snapshot.weights[positions], snapshot.weights[target], WEIGHT_SCALE)
+
+        religious_order = self._religious_order(snapshot)
+        levels = religious_order[snapshot.religious_levels[positions]]
+        target_level = religious_order[snapshot.religious_levels[target]]
+        if target_level < 0:
+            distance += MISSING_PENALTY
+        else:
+            distance += np.where(levels >= 0, (levels - target_level) ** 2, MISSING_PENALTY)
+
+        distance += snapshot.regions[positions] != snapshot.regions[target]
+        distance += snapshot.educations[positions] != snapshot.educations[target]
+
+        # Eng yaqin k ta: argpartition + saralash (teng masofada yangilari birinchi)
+        k = min(self.neighbours, len(positions))
+        nearest = np.argpartition(distance, k - 1)[:k]
+        order = np.lexsort((-snapshot.activated_at[positions[nearest]], distance[nearest]))
+        nearest = nearest[order]
+        return [int(user_id) for user_id in snapshot.user_ids[positions[nearest]]]
+
+    def for_user(self, user_id):
+        """Berilgan foydalanuvchiga o'xshash profillar egalari (user_id lar, yaqinlik tartibida)"""
+        similar_user_ids = self._cache.get(user_id)
+        if similar_user_ids is None:
+            similar_user_ids = self._compute(user_id)
+            self._cache.set(user_id, similar_user_ids)
+        return similar_user_ids
+
+
+# Worker bo'yicha umumiy - listing_index kabi Profile commit qilinganda tozalanadi
+# (bloklanganlar esa berishda feed_exclusions orqali chiqariladi)
+similar_profiles = SimilarProfiles(ttl=Config.SIMILAR_PROFILES_TTL)
+invalidate_on_commit(similar_profiles, Profile)
@@ -0,0 +1,140 @@
+from flask import current_app, make_response, request, session
+from collections import OrderedDict
+from functools import wraps
+import threading
+
+
+class _Call:
+    """Bajarilayotgan hisoblash - kutayotgan oqimlar natijani shu yerdan oladi"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Worker ichida bir xil parallel hisoblashlarni birlashtirish (single-flight)
+
+    Bir kalit bo'yicha hisoblash ketayotganda kelgan boshqa oqimlar bazaga qayta
+    murojaat qilmasdan o'sha natijani kutadi. Hisoblagichlar: hit (keshdan), miss (o'zi
+    hisobladi), coalesced (boshqa oqim natijasini kutdi) - nom bo'yicha jami va kalit
+    bo'yicha (oxirgi max_keys ta kalit, eng eskisi chiqarib tashlanadi).
+    """
+
+    def __init__(self, max_keys=1024):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+        self._key_stats = OrderedDict()
+
+    @staticmethod
+    def _counters():
+        return {'hit': 0, 'miss': 0, 'coalesced': 0}
+
+    def _count(self, name, key, outcome):
+        with self._lock:
+            self._stats.setdefault(name, self._counters())[outcome] += 1
+
+            flight_key = (name, key)
+            counters = self._key_stats.get(flight_key)
+            if counters is None:
+                counters = self._key_stats[flight_key] = self._counters()
+                while len(self._key_stats) > self.max_keys:
+                    self._key_stats.popitem(last=False)
+            else:
+                self._key_stats.move_to_end(flight_key)
+            counters[outcome] += 1
+
+    def do(self, name, key, compute, cache=None):
+        """compute() natijasini olish - (name, key) bo'yicha parallel chaqiruvlar bitta hisoblashni kutadi
+
+        cache berilsa (TTLCache) avval keshdan o'qiladi va natija keshga yoziladi.
+        """
+        if cache is not None:
+            value = cache.get(key)
+            if value is not None:
+                self._count(name, key, 'hit')
+                return value
+
+        flight_key = (name, key)
+        with self._lock:
+            call = self._calls.get(flight_key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[flight_key] = _Call()
+
+        if not is_leader:
+            self._count(name, key, 'coalesced')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        self._count(name, key, 'miss')
+        try:
+            call.value = compute()
+            # Kesh hisoblash yakunlanishidan oldin yoziladi - keyingi so'rovlar keshdan oladi
+            if cache is not None:
+                cache.set(key, call.value)
+            return call.value
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[flight_key]
+            call.done.set()
+
+    def stats(self):
+        """Nom bo'yicha jami va kalit bo'yicha hit/miss/coalesced hisoblagichlari"""
+        with self._lock:
+            stats = {name: dict(counters, keys={}) for name, counters in self._stats.items()}
+            for (name, key), counters in self._key_stats.items():
+                stats[name]['keys'][repr(key)] = dict(counters)
+            return stats
+
+
+flights = SingleFlight()
+
+
+def single_flight(name, key=None, cache=None):
+    """Ichki yuklovchilar uchun decorator - bir xil argumentli parallel chaqiruvlar birlashtiriladi
+
+    key - argumentlardan kalit yasovchi funksiya (default: argumentlarning o'zi).
+    Natija oqimlar orasida bo'lishiladi, shuning uchun uni o'zgartirmaslik kerak.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            flight_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return flights.do(name, flight_key, lambda: f(*args, **kwargs), cache=cache)
+        return wrapper
+    return decorator
+
+
+def _default_view_key():
+    # Javob foydalanuvchiga bog'liq bo'lishi mumkin - kalitga sessiya foydalanuvchisi kiradi
+    return session.get('user_id'), request.full_path
+
+
+def single_flight_view(name, key=None):
+    """Blueprint view'lari uchun decorator - bir xil parallel GET so'rovlar bitta javobni kutadi
+
+    key - so'rovdan kalit yasovchi funksiya (default: foydalanuvchi + to'liq yo'l).
+    Har bir oqim javobning o'z nusxasini oladi (sarlavhalar va cookie'lar alohida).
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            response = flights.do(name, key() if key else _default_view_key(),
+                                  lambda: make_response(f(*args, **kwargs)))
+            return current_app.response_class(
+                response.get_data(), status=response.status_code, headers=list(response.headers)
+            )
+        return wrapper
+    return decorator
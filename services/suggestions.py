@@ -0,0 +1,209 @@
+from database import db
+from models import User, Profile, UserPair, DailySuggestion
+from services.listing_index import ListingIndex
+from services.matching import match_scores
+from config import Config
+from collections import namedtuple
+from datetime import datetime
+import multiprocessing
+import numpy as np
+import time
+
+# match_scores() uchun ko'ruvchi ma'lumotlari (jarayonlar orasida yuboriladi)
+Viewer = namedtuple('Viewer', [
+    'user_id', 'gender', 'region', 'birth_year', 'religious_level', 'marital_status',
+    'partner_age_min', 'partner_age_max', 'partner_region', 'partner_religious_level',
+    'partner_marital_status', 'contacted_ids'
+])
+
+# Ishchi jarayondagi holat: jins bo'yicha nomzodlar pool'i (initializer orqali o'rnatiladi)
+_worker_state = {}
+
+
+def _init_worker(pools, top_k, min_score, now):
+    _worker_state.update(pools=pools, top_k=top_k, min_score=min_score, now=now)
+
+
+def _top_candidates(viewer, pool, top_k, min_score, now):
+    """Bitta ko'ruvchi uchun eng mos top_k nomzod: [(user_id, bal)]"""
+    scores = match_scores(viewer, pool, now)
+    eligible = scores >= min_score
+    if len(viewer.contacted_ids):
+        eligible &= ~np.isin(pool.user_ids, viewer.contacted_ids)
+    positions = np.flatnonzero(eligible)
+    if not len(positions):
+        return []
+
+    # Chegaradagi teng ballar ham saralashga tushishi uchun k-chi eng katta bal bo'yicha kesish
+    if len(positions) > top_k:
+        threshold = np.partition(scores[positions], -top_k)[-top_k]
+        positions = positions[scores[positions] >= threshold]
+
+    # Saralash: bal, keyin yangilari (feed tartibidagi kabi)
+    order = np.lexsort((
+        -pool.profile_ids[positions],
+        -pool.activated_at[positions],
+        -scores[positions]
+    ))
+    positions = positions[order[:top_k]]
+    return [(int(pool.user_ids[position]), int(scores[position])) for position in positions]
+
+
+def _compute_shard(viewers):
+    """Bitta shard (jins + viloyat) ko'ruvchilari uchun tavsiyalar"""
+    state = _worker_state
+    results = []
+    for viewer in viewers:
+        opposite_gender = 'Ayol' if viewer.gender == 'Erkak' else 'Erkak'
+        pool = state['pools'].get(opposite_gender)
+        if pool is None or not len(pool):
+            continue
+        results.append((viewer.user_id, _top_candidates(viewer, pool, state['top_k'], state['min_score'], state['now'])))
+    return results
+
+
+def _load_viewers(blocked_ids):
+    """Tavsiya oladigan foydalanuvchilar: faol, to'liq profil, bloklanmagan"""
+    contacted = {}
+    for low, high in db.session.query(UserPair.user_low_id, UserPair.user_high_id):
+        contacted.setdefault(low, []).append(high)
+        contacted.setdefault(high, []).append(low)
+
+    viewers = []
+    complete_profiles = Profile.query.filter(Profile.is_active == True, Profile.is_complete == True)
+    for profile in complete_profiles.yield_per(1000):
+        if profile.user_id in blocked_ids:
+            continue
+        viewers.append(Viewer(
+            profile.user_id, profile.gender, profile.region, profile.birth_year, profile.religious_level,
+            profile.marital_status, profile.partner_age_min, profile.partner_age_max, profile.partner_region,
+            profile.partner_religious_level, profile.partner_marital_status,
+            np.array(sorted(contacted.get(profile.user_id, ())), dtype=np.int64)
+        ))
+    return viewers
+
+
+def compute_daily_suggestions(batch_date=None, top_k=None, min_score=None, workers=None):
+    """Barcha to'liq profillar uchun top-K tavsiyalarni hisoblab daily_suggestions ga yozish
+
+    Ko'ruvchilar (jins, viloyat) bo'yicha shardlarga bo'linadi va jarayonlar pool'ida
+    hisoblanadi. Qaytaradi: statistika (dict).
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    batch_date = batch_date or now.date()
+    top_k = top_k or Config.DAILY_SUGGESTIONS_TOP_K
+    min_score = Config.DAILY_SUGGESTIONS_MIN_SCORE if min_score is None else min_score
+    workers = workers or Config.DAILY_SUGGESTIONS_WORKERS or multiprocessing.cpu_count()
+
+    blocked_ids = {user_id for (user_id,) in db.session.query(User.id).filter(User.is_blocked == True)}
+
+    # Nomzodlar: jins bo'yicha faol, bloklanmagan profillar snapshot'i
+    snapshot = ListingIndex().snapshot()
+    candidates = snapshot.is_active & ~np.isin(snapshot.user_ids, np.array(sorted(blocked_ids), dtype=np.int64))
+    pools = {
+        gender: snapshot.take(np.flatnonzero(candidates & (snapshot.genders == snapshot.code(gender))))
+        for gender in ('Erkak', 'Ayol')
+    }
+
+    viewers = _load_viewers(blocked_ids)
+    shards = {}
+    for viewer in viewers:
+        shards.setdefault((viewer.gender, viewer.region), []).append(viewer)
+    loaded = time.perf_counter()
+
+    if workers > 1 and len(shards) > 1:
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(pools, top_k, min_score, now)) as process_pool:
+            shard_results = process_pool.map(_compute_shard, list(shards.values()), chunksize=1)
+    else:
+        _init_worker(pools, top_k, min_score, now)
+        shard_results = [_compute_shard(shard) for shard in shards.values()]
+    computed = time.perf_counter()
+
+    rows = [
+        {
+            'user_id': user_id, 'suggested_user_id': suggested_user_id, 'batch_date': batch_date,
+            'position': position, 'score': score, 'created_at': now
+        }
+        for results in shard_results
+        for user_id, suggestions in results
+        for position, (suggested_user_id, score) in enumerate(suggestions, start=1)
+    ]
+
+    # Shu kunning avvalgi natijalari almashtiriladi (qayta ishga tushirish xavfsiz)
+    DailySuggestion.query.filter_by(batch_date=batch_date).delete()
+    for start in range(0, len(rows), 5000):
+        db.session.execute(DailySuggestion.__table__.insert(), rows[start:start + 5000])
+    db.session.commit()
+    finished = time.perf_counter()
+
+    return {
+        'batch_date': batch_date.isoformat(),
+        'viewers': len(viewers),
+        'shards': len(shards),
+        'workers': workers,
+        'suggestions': len(rows),
+        'load_seconds': round(loaded - started, 2),
+        'compute_seconds': round(computed - loaded, 2),
+        'write_seconds': round(finished - computed, 2),
+        'total_seconds': round(finished - started, 2)
+    }
+
+
+def _digest_message(suggestions):
+    """Bitta foydalanuvchi uchun kunlik digest matni"""
+    lines = ["💞 Bugungi tavsiyalar!", "", "Siz uchun eng mos e'lonlar:"]
+    for suggestion in suggestions:
+        profile = suggestion.suggested_user.profile if suggestion.suggested_user else None
+        if not profile:
+            continue
+        details = ', '.join(str(value) for value in (profile.age, profile.region, profile.profession) if value)
+        lines.append(f"• {profile.name or 'Foydalanuvchi'} ({details})")
+    lines += ["", "📱 Mini App'da ko'rish uchun: /start"]
+    return '\n'.join(lines)
+
+
+def send_daily_digests(batch_date=None, per_message=None):
+    """Hisoblangan tavsiyalarni har bir foydalanuvchiga bitta bot xabari sifatida yuborish
+
+    Yuborilgan tavsiyalar notified_at bilan belgilanadi - qayta ishga tushirilsa takrorlanmaydi.
+    Qaytaradi: (yuborilgan, xato) soni.
+    """
+    import asyncio
+    from telegram_bot import send_notification
+
+    batch_date = batch_date or datetime.utcnow().date()
+    per_message = per_message or Config.DAILY_SUGGESTIONS_PER_MESSAGE
+
+    user_ids = [
+        user_id for (user_id,) in db.session.query(DailySuggestion.user_id).filter(
+            DailySuggestion.batch_date == batch_date,
+            DailySuggestion.notified_at.is_(None)
+        ).distinct()
+    ]
+
+    sent = failed = 0
+    loop = asyncio.new_event_loop()
+    try:
+        for user_id in user_ids:
+            user = User.query.get(user_id)
+            suggestions = DailySuggestion.query.filter_by(
+                user_id=user_id, batch_date=batch_date
+            ).order_by(DailySuggestion.position).limit(per_message).all()
+
+            if user and user.telegram_id and not user.is_blocked:
+                if loop.run_until_complete(send_notification(user.telegram_id, _digest_message(suggestions))):
+                    sent += 1
+                else:
+                    failed += 1
+                    continue
+
+            DailySuggestion.query.filter_by(user_id=user_id, batch_date=batch_date).update(
+                {'notified_at': datetime.utcnow()}
+            )
+            db.session.commit()
+    finally:
+        loop.close()
+
+    return sent, failed
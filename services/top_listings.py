@@ -0,0 +1,58 @@
+from database import db
+from models import Profile, UserTariff, Favorite
+from services.cache import TTLCache, invalidate_on_commit
+from services.singleflight import flights
+from config import Config
+from datetime import datetime
+
+
+class TopListings:
+    """Jins bo'yicha oldindan hisoblangan TOP e'lonlar ro'yxati (worker ichida umumiy)
+
+    Ro'yxat tarif tasdiqlanganda yoki muddati tugaganda (UserTariff/Profile/Favorite commit)
+    va qisqa taymer bo'yicha qayta quriladi. Muddati o'tgan TOP'lar har o'qishda
+    top_until bo'yicha tushirib qoldiriladi, shuning uchun qayta qurishni kutmaydi.
+    """
+
+    def __init__(self, ttl):
+        self._cache = TTLCache(ttl=ttl, max_entries=8)
+
+    def clear(self):
+        """Keyingi o'qishda qayta qurishni majburlash"""
+        self._cache.clear()
+
+    def _build(self, gender):
+        """TOP e'lonlarni feed tartibida yuklash: activated_at, id (kamayish)"""
+        now = datetime.utcnow()
+        query = Profile.query.filter(Profile.is_active == True, Profile.top_until > now)
+        if gender is not None:
+            query = query.filter(Profile.gender == gender)
+        profiles = query.order_by(db.desc(Profile.activated_at), db.desc(Profile.id)).all()
+
+        entries = []
+        for profile in profiles:
+            listing = profile.to_dict()
+            listing['is_top'] = True
+            listing['user_id'] = profile.user_id
+            entries.append((profile.top_until, profile.activated_at, profile.id, listing))
+        return entries
+
+    def entries(self, gender):
+        """Hozir TOP da turgan e'lonlar: (activated_at, id, listing) ro'yxati
+
+        gender - e'lonlar jinsi, None bo'lsa barcha jinslar.
+        """
+        # Qayta qurish paytida kelgan so'rovlar bitta qurishni kutadi
+        entries = flights.do('top_listings', gender, lambda: self._build(gender), cache=self._cache)
+
+        now = datetime.utcnow()
+        return [
+            (activated_at, profile_id, listing)
+            for top_until, activated_at, profile_id, listing in entries
+            if top_until > now
+        ]
+
+
+# Worker bo'yicha umumiy TOP ro'yxati - tarif, profil yoki sevimli (favorites_count) commit qilinganda tozalanadi
+top_listings = TopListings(ttl=Config.TOP_LISTINGS_TTL)
+invalidate_on_commit(top_listings, Profile, UserTariff, Favorite)
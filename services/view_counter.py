@@ -0,0 +1,178 @@
+from database import db
+from models import Profile, ProfileViewStat
+from services.hyperloglog import HyperLogLog
+from config import Config
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Xatolikdan keyin yozuv shuncha flush'da qayta urinadi, keyin tashlab yuboriladi
+MAX_FLUSH_ATTEMPTS = 5
+
+
+class ViewCounter:
+    """Profil ko'rishlarini worker xotirasida yig'ib, davriy ravishda guruhlab yozish
+
+    Har ko'rishda bazaga yozilmaydi: hisoblagich va noyob ko'ruvchilar sketch'i xotirada
+    to'planadi va fon oqimida (flush_interval soniyada yoki max_pending profilga
+    yetganda) bitta tranzaksiyada yoziladi. Jarayon to'xtaganda qolganlari ham yoziladi.
+    """
+
+    def __init__(self, flush_interval, max_pending):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = {}  # profile_id -> [ko'rishlar, HyperLogLog, muvaffaqiyatsiz urinishlar]
+        self._wake = threading.Event()
+        self._app = None
+
+    def record(self, profile_id, viewer_id):
+        """Bitta ko'rishni qayd qilish (so'rov oqimida, bazasiz)"""
+        with self._lock:
+            entry = self._pending.get(profile_id)
+            if entry is None:
+                entry = self._pending[profile_id] = [0, HyperLogLog(), 0]
+            entry[0] += 1
+            entry[1].add(viewer_id)
+
+            if self._app is None:
+                self._start(current_app._get_current_object())
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+
+    def _start(self, app):
+        self._app = app
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Ko'rishlar hisoblagichini yozishda xatolik")
+
+    def flush(self):
+        """Yig'ilgan ko'rishlarni bazaga yozish. Qaytaradi: yangilangan profillar soni"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending or self._app is None:
+            return 0
+
+        with self._app.app_context():
+            try:
+                try:
+                    self._write(pending)
+                except IntegrityError:
+                    # Boshqa worker shu kungi qatorni parallel yaratdi - endi u mavjud
+                    db.session.rollback()
+                    self._write(pending)
+            except Exception:
+                db.session.rollback()
+                self._restore(self._retryable(pending))
+                raise
+            finally:
+                db.session.remove()
+        return len(pending)
+
+    def _retryable(self, pending):
+        """Xatolikdan keyin qayta yoziladigan yozuvlar
+
+        O'chirilgan profillar (masalan FK xatosi) va MAX_FLUSH_ATTEMPTS marta yozilmagan
+        yozuvlar tashlanadi - aks holda bitta buzuq yozuv butun to'plamni to'xtatib qo'yadi.
+        """
+        try:
+            existing_ids = {
+                profile_id for (profile_id,) in
+                db.session.query(Profile.id).filter(Profile.id.in_(list(pending)))
+            }
+        except Exception:
+            db.session.rollback()
+            existing_ids = set(pending)
+
+        retryable, dropped = {}, []
+        for profile_id, (views, sketch, attempts) in pending.items():
+            if profile_id in existing_ids and attempts + 1 < MAX_FLUSH_ATTEMPTS:
+                retryable[profile_id] = [views, sketch, attempts + 1]
+            else:
+                dropped.append(profile_id)
+        if dropped:
+            logger.warning("Ko'rishlar yozilmadi va tashlandi (profillar: %s)", dropped)
+        return retryable
+
+    def _restore(self, pending):
+        """Yozilmagan ko'rishlarni keyingi flush uchun qaytarish"""
+        with self._lock:
+            for profile_id, (views, sketch, attempts) in pending.items():
+                entry = self._pending.get(profile_id)
+                if entry is None:
+                    self._pending[profile_id] = [views, sketch, attempts]
+                else:
+                    entry[0] += views
+                    entry[1].merge(sketch)
+                    entry[2] = max(entry[2], attempts)
+
+    def _write(self, pending):
+        today = datetime.utcnow().date()
+        profile_ids = list(pending)
+        stats_table = ProfileViewStat.__table__
+        profiles_table = Profile.__table__
+
+        # Kunlik qatorlar: sketch'lar birlashtiriladi (qator qulflanadi - parallel flush'lar uchun)
+        existing = {
+            row.profile_id: row for row in db.session.execute(
+                db.select(stats_table.c.profile_id, stats_table.c.views, stats_table.c.unique_sketch).where(
+                    stats_table.c.profile_id.in_(profile_ids),
+                    stats_table.c.view_date == today
+                ).with_for_update()
+            )
+        }
+        updates, inserts = [], []
+        for profile_id, (views, sketch, _) in pending.items():
+            row = existing.get(profile_id)
+            if row is None:
+                inserts.append({'profile_id': profile_id, 'view_date': today, 'views': views,
+                                'unique_sketch': sketch.to_bytes()})
+            else:
+                merged = HyperLogLog.from_bytes(row.unique_sketch).merge(sketch)
+                updates.append({'stat_profile_id': profile_id, 'added_views': views,
+                                'unique_sketch': merged.to_bytes()})
+        if inserts:
+            db.session.execute(stats_table.insert(), inserts)
+        if updates:
+            db.session.execute(
+                stats_table.update().where(
+                    stats_table.c.profile_id == db.bindparam('stat_profile_id'),
+                    stats_table.c.view_date == today
+                ).values(views=stats_table.c.views + db.bindparam('added_views'),
+                         unique_sketch=db.bindparam('unique_sketch')),
+                updates
+            )
+
+        # Profil ustunlari: jami ko'rishlar (atomar qo'shish) va oxirgi N kun noyob ko'ruvchilari.
+        # updated_at o'zgartirilmaydi - to_dict keshi va ListingIndex ko'rishlar sababli yangilanmaydi
+        summary = ProfileViewStat.summary(profile_ids, Config.UNIQUE_VIEWERS_DAYS)
+        db.session.execute(
+            profiles_table.update().where(profiles_table.c.id == db.bindparam('viewed_profile_id')).values(
+                views_count=db.func.coalesce(profiles_table.c.views_count, 0) + db.bindparam('added_views'),
+                unique_viewers=db.bindparam('unique_viewers'),
+                updated_at=profiles_table.c.updated_at
+            ),
+            [
+                {'viewed_profile_id': profile_id, 'added_views': views, 'unique_viewers': summary[profile_id][1]}
+                for profile_id, (views, sketch, _) in pending.items()
+            ]
+        )
+        db.session.commit()
+
+
+# Worker bo'yicha umumiy hisoblagich
+view_counter = ViewCounter(flush_interval=Config.VIEW_COUNTER_FLUSH_INTERVAL,
+                           max_pending=Config.VIEW_COUNTER_MAX_PENDING)
@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+import pytest
+
+# app import qilinishidan oldin: vaqtinchalik SQLite baza, botsiz
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+_db_file.close()
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+os.environ['TELEGRAM_BOT_TOKEN'] = ''
+os.environ.setdefault('MEDIA_DIR', tempfile.mkdtemp())
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    yield flask_app
+    os.unlink(_db_file.name)
+
+
+@pytest.fixture
+def sql_counter(app):
+    """Bazaga yuborilgan SQL statementlar soni (before_cursor_execute)"""
+    from database import db
+    from sqlalchemy import event
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', count)
+
@@ -0,0 +1,163 @@
+"""Feed sahifasi uchun SQL statementlar soni (N+1 qaytib kelmasligi uchun)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+PROFILE = dict(
+    birth_year=1995, region='Buxoro', nationality="O'zbek", marital_status="Bo'ydoq",
+    height=170, weight=60, prays='Ha', fasts='Ha', religious_level='Jiddiy', education='Oliy',
+    profession='Muhandis', is_working=True, partner_age_min=20, partner_age_max=35,
+    partner_region='Istalgan', partner_religious_level='Istalgan', partner_marital_status="Bo'ydoq",
+    is_active=True
+)
+
+# Sovuq cursor sahifa: foydalanuvchi (profil va tarif bilan), bog'langanlar, bloklanganlar,
+# listing_counters, sahifa, sevimlilar, user_pairs
+COLD_CURSOR_STATEMENTS = 7
+# Issiq (keshdagi) sahifa: foydalanuvchi, sevimlilar, user_pairs
+WARM_CURSOR_STATEMENTS = 3
+# Eski ?page= rejimi: sovuq cursor sahifa + COUNT
+PAGE_MODE_STATEMENTS = 8
+
+
+@pytest.fixture
+def viewer(app):
+    """Erkak ko'ruvchi va 40 ta faol Ayol e'lon (so'rovlar o'z app context'ida ishlaydi)"""
+    from database import db
+    from models import User, Profile
+
+    with app.app_context():
+        user_ids = []
+        for index in range(41):
+            user = User(telegram_id=10_000 + index)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Profile(
+                user_id=user.id, name=f'Foydalanuvchi {index}', gender='Erkak' if index == 0 else 'Ayol',
+                activated_at=datetime.utcnow() - timedelta(minutes=index), **PROFILE
+            ))
+            user_ids.append(user.id)
+        db.session.commit()
+
+    yield user_ids[0]
+
+    with app.app_context():
+        for profile in Profile.query.filter(Profile.user_id.in_(user_ids)):
+            db.session.delete(profile)
+        User.query.filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+@pytest.fixture(autouse=True)
+def cold_caches():
+    from routes.feed import feed_page_cache
+    from services.exclusions import feed_exclusions
+    feed_page_cache.clear()
+    feed_exclusions.clear()
+
+
+@pytest.fixture
+def client(app, viewer):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = viewer
+    return client
+
+
+def test_cursor_page_statement_count(client, sql_counter):
+    response = client.get('/feed/api/listings?cursor=')
+    assert response.status_code == 200
+    assert len(response.get_json()['listings']) == 20
+    assert len(sql_counter) == COLD_CURSOR_STATEMENTS
+
+
+def test_cached_cursor_page_statement_count(client, sql_counter):
+    client.get('/feed/api/listings?cursor=')
+    sql_counter.clear()
+
+    response = client.get('/feed/api/listings?cursor=')
+    assert response.status_code == 200
+    assert len(response.get_json()['listings']) == 20
+    assert len(sql_counter) == WARM_CURSOR_STATEMENTS
+
+
+def test_next_cursor_page_does_not_grow_with_listings(client, sql_counter):
+    first_page = client.get('/feed/api/listings?cursor=').get_json()
+    sql_counter.clear()
+
+    response = client.get(f"/feed/api/listings?cursor={first_page['next_cursor']}")
+    assert response.status_code == 200
+    assert len(response.get_json()['listings']) == 20
+    # Bog'langanlar/bloklanganlar keshda: foydalanuvchi, listing_counters, sahifa, sevimlilar, user_pairs
+    assert len(sql_counter) == COLD_CURSOR_STATEMENTS - 2
+
+
+def test_page_mode_statement_count(client, sql_counter):
+    response = client.get('/feed/api/listings?page=1')
+    assert response.status_code == 200
+    assert len(response.get_json()['listings']) == 20
+    assert len(sql_counter) == PAGE_MODE_STATEMENTS
+
+
+def test_match_cursor_pages_cover_pool_once(client):
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(f'/feed/api/listings?sort=match&cursor={cursor}')
+        assert response.status_code == 200
+        data = response.get_json()
+        seen.extend(listing['user_id'] for listing in data['listings'])
+        cursor = data['next_cursor']
+    assert len(seen) == len(set(seen)) == 40
+
+
+def test_match_cursor_rejects_feed_cursor(client):
+    first_page = client.get('/feed/api/listings?cursor=').get_json()
+    response = client.get(f"/feed/api/listings?sort=match&cursor={first_page['next_cursor']}")
+    assert response.status_code == 400
+
+
+def test_filtered_feed_falls_back_to_all_genders(app, viewer, client):
+    from database import db
+    from models import Profile
+
+    # Qarshi jins e'lonlari yo'q - ko'ruvchi ham Ayol bo'lib qoladi
+    with app.app_context():
+        Profile.query.filter_by(user_id=viewer).one().gender = 'Ayol'
+        db.session.commit()
+
+    response = client.get('/feed/api/listings?region=Buxoro&page=1')
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 40
+
+
+@pytest.fixture
+def blocked(app, viewer):
+    """Birinchi sahifadagi 3 ta e'lon egasi bloklangan"""
+    from database import db
+    from models import User
+
+    with app.app_context():
+        User.query.filter(User.id.in_([viewer + 1, viewer + 5, viewer + 10])).update(
+            {'is_blocked': True}, synchronize_session=False
+        )
+        db.session.commit()
+
+
+def test_cursor_pages_stay_full_after_exclusions(client, blocked):
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        data = client.get(f'/feed/api/listings?cursor={cursor}').get_json()
+        if data['next_cursor']:
+            assert len(data['listings']) == 20
+        seen.extend(listing['user_id'] for listing in data['listings'])
+        cursor = data['next_cursor']
+    assert len(seen) == len(set(seen)) == 37
+
+
+def test_page_mode_total_excludes_blocked(client, blocked):
+    data = client.get('/feed/api/listings?page=2').get_json()
+    assert data['total'] == 37
+    assert data['pages'] == 2
+    assert not data['has_next']